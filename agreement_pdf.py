@@ -0,0 +1,289 @@
+# agreement_pdf.py
+import io
+import os
+import re
+import csv
+import json
+import string
+import zipfile
+import threading
+
+from concurrency import ProcessPool
+import metrics
+import startup
+
+BATCH_MAX_ROWS = int(os.getenv('AGREEMENT_BATCH_MAX_ROWS', '1000'))
+# Rows rendered per pool task; amortizes the inter-process round trip.
+BATCH_CHUNK_ROWS = int(os.getenv('AGREEMENT_BATCH_CHUNK_ROWS', '25'))
+# Batches render in their own pool so a bad batch cannot take down PDF extraction or e-stamp scans.
+BATCH_WORKERS = int(os.getenv('AGREEMENT_BATCH_WORKERS', str(min(4, os.cpu_count() or 1))))
+
+FIELD_DEFAULTS = {
+    'agreement_date': '_________',
+    'landlord_name': '[Landlord Name]',
+    'tenant_name': '[Tenant Name]',
+    'property_address': '[Property Address]',
+    'term_months': 11,
+    'rent_amount': 0,
+    'deposit_amount': 0,
+    'additional_clauses': '',
+}
+
+# The agreement skeleton. ('text', style, template) paragraphs without fields are wrapped once
+# when the template is compiled; only the paragraphs with fields are laid out per request.
+AGREEMENT_LAYOUT = [
+    ('title', "RENTAL AGREEMENT"),
+    ('space', 10),
+    ('text', '', "This Rental Agreement is made on this day, {agreement_date},"),
+    ('space', 5),
+    ('text', '', "BETWEEN: {landlord_name} (hereinafter referred to as the \"LANDLORD\")."),
+    ('space', 5),
+    ('text', '', "AND: {tenant_name} (hereinafter referred to as the \"TENANT\")."),
+    ('space', 10),
+    ('text', '', "The landlord agrees to rent to the tenant the property located at: {property_address}."),
+    ('space', 10),
+    ('text', 'B', "1. TERM: The term of this lease shall be for {term_months} months."),
+    ('text', 'B', "2. RENT: The monthly rent shall be Rs. {rent_amount}/-."),
+    ('text', 'B', "3. DEPOSIT: The tenant has paid a security deposit of Rs. {deposit_amount}/-."),
+    ('optional', 'additional_clauses', 5),
+    ('space', 20),
+    ('text', '', "IN WITNESS WHEREOF, the parties have executed this agreement."),
+    ('space', 20),
+    ('text', '', "_________________________"),
+    ('text', '', "LANDLORD ({landlord_signature})"),
+    ('space', 20),
+    ('text', '', "_________________________"),
+    ('text', '', "TENANT ({tenant_signature})"),
+]
+
+FONT_FAMILY = 'Helvetica'
+FONT_SIZE = 12
+LINE_HEIGHT = 8
+_FILENAME_UNSAFE = re.compile(r'[^A-Za-z0-9._-]+')
+# The built-in PDF fonts only cover Latin-1; common symbols outside it are spelled out.
+_PDF_REPLACEMENTS = str.maketrans({
+    '\u20b9': 'Rs.', '\u2018': "'", '\u2019': "'", '\u201c': '"', '\u201d': '"',
+    '\u2013': '-', '\u2014': '-', '\u2026': '...', '\u2022': '-', '\u20ac': 'EUR',
+})
+
+
+class BatchError(ValueError):
+    pass
+
+
+def pdf_text(name, value):
+    """`value` as text the PDF font can show; raises BatchError if it still has characters outside Latin-1."""
+    text = str(value).translate(_PDF_REPLACEMENTS)
+    unsupported = ''.join(sorted({char for char in text if ord(char) > 0xff}))
+    if unsupported:
+        raise BatchError(f"{name} contains characters the PDF font cannot show: {unsupported[:10]}")
+    return text
+
+
+def agreement_fields(data):
+    fields = {key: pdf_text(key, data.get(key) or default) for key, default in FIELD_DEFAULTS.items()}
+    # The signature lines leave the name blank rather than showing a placeholder.
+    fields['landlord_signature'] = pdf_text('landlord_name', data.get('landlord_name', ''))
+    fields['tenant_signature'] = pdf_text('tenant_name', data.get('tenant_name', ''))
+    return fields
+
+
+class AgreementTemplate:
+    """The agreement layout compiled once: static text pre-wrapped, word widths memoized."""
+
+    def __init__(self, layout=AGREEMENT_LAYOUT):
+        probe = startup.load('fpdf').FPDF()
+        probe.add_page()
+        self._probe = probe
+        self._line_width = probe.epw - 2 * probe.c_margin
+        self._widths = {}
+        self._lock = threading.Lock()
+        self.ops = []
+        for op in layout:
+            if op[0] == 'text':
+                _, style, template = op
+                if any(name for _, name, _, _ in string.Formatter().parse(template)):
+                    self.ops.append(('fill', style, template))
+                else:
+                    self.ops.append(('lines', style, self.wrap(template, style)))
+            else:
+                self.ops.append(op)
+
+    def _word_width(self, word, style):
+        key = (style, word)
+        width = self._widths.get(key)
+        if width is None:
+            with self._lock:
+                self._probe.set_font(FONT_FAMILY, style, FONT_SIZE)
+                width = self._probe.get_string_width(word)
+            if len(self._widths) > 50000:
+                # Field values add new words on every render; keep the memo bounded.
+                self._widths.clear()
+            self._widths[key] = width
+        return width
+
+    def wrap(self, text, style=''):
+        """Greedy word wrap with the same line width as multi_cell(0, ...)."""
+        lines = []
+        space = self._word_width(' ', style)
+        for paragraph in text.split('\n'):
+            line, width = [], 0.0
+            for word in paragraph.split(' '):
+                word_width = self._word_width(word, style)
+                if line and width + space + word_width > self._line_width:
+                    lines.append(' '.join(line))
+                    line, width = [], 0.0
+                while word_width > self._line_width and len(word) > 1:
+                    # A single word wider than the page is broken by characters, as multi_cell does.
+                    cut = len(word)
+                    while cut > 1 and self._word_width(word[:cut], style) > self._line_width:
+                        cut -= 1
+                    lines.append(word[:cut])
+                    word = word[cut:]
+                    word_width = self._word_width(word, style)
+                width = word_width if not line else width + space + word_width
+                line.append(word)
+            lines.append(' '.join(line))
+        return lines
+
+    @metrics.timed('pdf_render')
+    def render(self, data):
+        fields = agreement_fields(data)
+        pdf = startup.load('fpdf').FPDF()
+        pdf.add_page()
+        for op in self.ops:
+            kind = op[0]
+            if kind == 'title':
+                pdf.set_font(FONT_FAMILY, 'B', 16)
+                pdf.cell(0, 10, op[1], align='C', new_x='LMARGIN', new_y='NEXT')
+            elif kind == 'space':
+                pdf.ln(op[1])
+            elif kind == 'optional':
+                _, field, space = op
+                if fields[field]:
+                    pdf.ln(space)
+                    self._emit(pdf, '', self.wrap(str(fields[field])))
+            elif kind == 'fill':
+                _, style, template = op
+                self._emit(pdf, style, self.wrap(template.format(**fields), style))
+            else:
+                _, style, lines = op
+                self._emit(pdf, style, lines)
+        return bytes(pdf.output())
+
+    def _emit(self, pdf, style, lines):
+        pdf.set_font(FONT_FAMILY, style, FONT_SIZE)
+        for line in lines:
+            pdf.cell(0, LINE_HEIGHT, line, new_x='LMARGIN', new_y='NEXT')
+
+
+_template = None
+_template_lock = threading.Lock()
+
+
+def get_template():
+    # Compiled once per process, including inside batch pool workers.
+    global _template
+    with _template_lock:
+        if _template is None:
+            _template = AgreementTemplate()
+        return _template
+
+
+def render_agreement(data):
+    return get_template().render(data)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPool(BATCH_WORKERS, name='agreement rendering')
+        return _pool
+
+
+def render_many(rows):
+    # Pool worker entry point: [(filename, row)] -> [(filename, pdf bytes or None, error or None)].
+    # Errors go back as plain strings; an exception that cannot be unpickled would break the pool.
+    template = get_template()
+    results = []
+    for filename, row in rows:
+        try:
+            results.append((filename, template.render(row), None))
+        except Exception as e:
+            results.append((filename, None, f"{type(e).__name__}: {e}"))
+    return results
+
+
+def parse_batch_rows(file=None, payload=None):
+    """Read agreement rows from an uploaded .csv/.json file or a JSON body ({'rows': [...]} or a list)."""
+    rows = payload.get('rows') if isinstance(payload, dict) else payload
+    if file is not None:
+        raw = file.read().decode('utf-8-sig')
+        if file.filename.lower().endswith('.csv'):
+            rows = list(csv.DictReader(io.StringIO(raw)))
+        elif file.filename.lower().endswith('.json'):
+            try:
+                rows = json.loads(raw)
+            except ValueError:
+                raise BatchError(f"{file.filename} is not valid JSON.")
+            rows = rows.get('rows') if isinstance(rows, dict) else rows
+        else:
+            raise BatchError("Upload a .csv or .json file of agreement rows.")
+    if not isinstance(rows, list) or not rows or not all(isinstance(row, dict) for row in rows):
+        raise BatchError("Provide a non-empty list of agreement rows.")
+    if len(rows) > BATCH_MAX_ROWS:
+        raise BatchError(f"A batch can contain at most {BATCH_MAX_ROWS} agreements.")
+    for index, row in enumerate(rows, start=1):
+        try:
+            agreement_fields(row)
+        except BatchError as e:
+            raise BatchError(f"Row {index}: {e}")
+    return rows
+
+
+def batch_filenames(rows):
+    names, seen = [], set()
+    for index, row in enumerate(rows, start=1):
+        base = row.get('filename') or f"Rental_Agreement_{index:04d}_{row.get('tenant_name') or 'tenant'}"
+        base = _FILENAME_UNSAFE.sub('_', os.path.splitext(str(base))[0]).strip('_') or f"agreement_{index}"
+        name = f"{base}.pdf"
+        if name in seen:
+            name = f"{base}_{index}.pdf"
+        seen.add(name)
+        names.append(name)
+    return names
+
+
+class _ZipStream(io.RawIOBase):
+    """Write-only sink for zipfile; the bytes written so far are drained after each entry."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_zip(entries):
+    """Stream a ZIP archive from an iterable of (filename, bytes) without buffering the whole archive."""
+    sink = _ZipStream()
+    # The PDFs are already compressed, so deflating them again only costs CPU.
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for filename, data in entries:
+            archive.writestr(filename, data)
+            yield sink.drain()
+    yield sink.drain()
@@ -1,28 +1,49 @@
+import time
+# Taken before every other import so the startup report covers the whole app import.
+BOOT_STARTED = time.perf_counter()
+
 import os
+import math
 import threading
 import json
 import uuid
-import io
-import hashlib
 import logging
 import re
 from flask import (
-    Flask, request, jsonify, redirect, url_for, send_file, render_template, session
+    Flask, request, jsonify, redirect, url_for, send_file, render_template, session,
+    Response, stream_with_context, g
 )
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import (
     LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 )
 from dotenv import load_dotenv
-from datetime import datetime
-from fpdf import FPDF
 from io import BytesIO
+from collections import deque
+from concurrent.futures import as_completed
 from flask_session import Session
+from llm_cache import LLMCache
+from concurrency import get_executor
+from gemini_client import GeminiClient, CircuitOpenError
+from chunking import split_into_chunks, join_translated_chunks
+import metrics
+import startup
 
 # --- Library Imports ---
-import google.generativeai as genai
-from gtts import gTTS
-import pdfplumber
+# Gemini, gTTS, pdfplumber and fpdf are loaded on first use (startup.load); see startup.warm_up for --preload.
+from tts import TTSCache, LANG_CODE
+import extraction
+import estamp
+from clause_detector import detector as clause_detector
+import date_extractor
+import agreement_pdf
+from document_store import DocumentStore, document_id_for
+from retrieval import IndexStore
+from history import MemoryHistoryStore, SQLiteHistoryStore
+import translation_memory
+import normalization
+from jobs import JobStore, JobEngine, JobQueueFull, InProcessBackend, CeleryBackend, use_in_memory_broker
+startup.record('app_imports', time.perf_counter() - BOOT_STARTED)
 
 # --- Basic Setup ---
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -37,22 +58,92 @@ try:
     GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
     if not GEMINI_API_KEY:
         raise ValueError("GEMINI_API_KEY not found in environment variables")
-    genai.configure(api_key=GEMINI_API_KEY)
 except Exception as e:
     logging.error(f"Configuration Error: {str(e)}")
     raise
 
 Session(app)
-TTS_CACHE_DIR = 'tts_cache'
-os.makedirs(TTS_CACHE_DIR, exist_ok=True)
+
+class TimedSessionInterface:
+    # Wraps the Flask-Session interface so session reads and writes show up as pipeline stages.
+    def __init__(self, interface):
+        self.interface = interface
+
+    def __getattr__(self, name):
+        return getattr(self.interface, name)
+
+    def open_session(self, app, request):
+        with metrics.span('session_load'):
+            return self.interface.open_session(app, request)
+
+    def save_session(self, app, session, response):
+        with metrics.span('session_save'):
+            return self.interface.save_session(app, session, response)
+
+app.session_interface = TimedSessionInterface(app.session_interface)
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+llm_cache = LLMCache(
+    max_entries=int(os.getenv('LLM_CACHE_SIZE', '512')),
+    disk_dir=os.getenv('LLM_CACHE_DIR') or None,
+    disk_ttl=int(os.getenv('LLM_CACHE_TTL', str(7 * 24 * 3600))),
+    disk_max_bytes=int(os.getenv('LLM_CACHE_MAX_MB', '256')) * 1024 * 1024
+)
+# Gemini limits, retries and the circuit breaker come from the GEMINI_* environment variables.
+gemini = GeminiClient.from_env(
+    cache=llm_cache,
+    on_wait=lambda seconds: metrics.STAGE_SECONDS.observe(seconds, stage='llm_queue', outcome='ok')
+)
+llm_executor = get_executor(int(os.getenv('LLM_EXECUTOR_WORKERS', '16')))
+TRANSLATION_CHUNK_TOKENS = int(os.getenv('TRANSLATION_CHUNK_TOKENS', '1500'))
+document_store = DocumentStore(
+    max_entries=int(os.getenv('DOCUMENT_STORE_SIZE', '256')),
+    max_bytes=int(os.getenv('DOCUMENT_STORE_MAX_MB', '64')) * 1024 * 1024
+)
+chat_indexes = IndexStore(
+    max_entries=int(os.getenv('CHAT_INDEX_SIZE', '128')),
+    chunk_tokens=int(os.getenv('CHAT_CHUNK_TOKENS', '300'))
+)
+# 'retrieval' sends only the top-k relevant chunks per question; 'full' sends the whole document.
+CHAT_CONTEXT_MODE = os.getenv('CHAT_CONTEXT_MODE', 'retrieval')
+CHAT_TOP_K = int(os.getenv('CHAT_TOP_K', '4'))
+# Upper bound for a per-request top_k; past this, 'full' context mode is the honest choice.
+CHAT_MAX_TOP_K = int(os.getenv('CHAT_MAX_TOP_K', '20'))
+TRANSLATION_STREAM_HEARTBEAT = float(os.getenv('TRANSLATION_STREAM_HEARTBEAT', '15'))
+TRANSLATION_STREAM_TIMEOUT = float(os.getenv('TRANSLATION_STREAM_TIMEOUT', '300'))
+# 'inprocess' (default), 'celery' (Redis broker from tasks.py) or 'celery-memory' (in-memory broker for tests)
+JOB_BACKEND = os.getenv('JOB_BACKEND', 'inprocess')
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '4'))
+JOB_QUEUE_SIZE = int(os.getenv('JOB_QUEUE_SIZE', '32'))
+JOB_RESULT_TTL = int(os.getenv('JOB_RESULT_TTL', '3600'))
+HISTORY_MAX_ITEMS = int(os.getenv('HISTORY_MAX_ITEMS', '100'))
+HISTORY_BACKEND = os.getenv('HISTORY_BACKEND', 'memory')
+HISTORY_DB_PATH = os.getenv('HISTORY_DB_PATH', os.path.join('instance', 'history.db'))
+# Segment-level translation memory; set TRANSLATION_MEMORY_PATH='' to translate whole chunks every time.
+TRANSLATION_MEMORY_PATH = os.getenv('TRANSLATION_MEMORY_PATH', os.path.join('instance', 'translation_memory.db'))
+# Absolute, since send_file resolves relative paths against the app root rather than the working directory.
+TTS_CACHE_DIR = os.path.abspath(os.getenv('TTS_CACHE_DIR', 'tts_cache'))
+tts_cache = TTSCache(
+    TTS_CACHE_DIR,
+    max_bytes=int(os.getenv('TTS_CACHE_MAX_MB', '512')) * 1024 * 1024,
+    chunk_chars=int(os.getenv('TTS_CHUNK_CHARS', '400')),
+    workers=int(os.getenv('TTS_WORKERS', '4'))
+)
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'
 
 # --- In-Memory Data Stores ---
-users = {'user1': {'password_hash': generate_password_hash('password123'), 'username': 'user1'}}
-translation_tasks = {}
-user_history = {}
+# Demo account (password123). The hash is precomputed: PBKDF2 at import cost every worker ~0.1s of boot.
+users = {'user1': {'password_hash': 'pbkdf2:sha256:260000$AOF1MwEckz8VIY39$2087ce545a463128dc991e375248b590774c43a00f2cf96a86d54e9e82dfa8c1', 'username': 'user1'}}
+translation_tasks = JobStore(ttl=JOB_RESULT_TTL)
+if HISTORY_BACKEND == 'sqlite':
+    user_history = SQLiteHistoryStore(HISTORY_DB_PATH, max_items=HISTORY_MAX_ITEMS)
+else:
+    user_history = MemoryHistoryStore(max_items=HISTORY_MAX_ITEMS)
+translation_store = translation_memory.TranslationMemory(
+    TRANSLATION_MEMORY_PATH,
+    max_entries=int(os.getenv('TRANSLATION_MEMORY_MAX_ENTRIES', '200000'))
+) if TRANSLATION_MEMORY_PATH else None
 
 class User(UserMixin):
     def __init__(self, id, username, password_hash):
@@ -69,47 +160,69 @@ def load_user(user_id):
 
 # --- Utility Functions ---
 def add_to_history(username, activity_type, content, result=None):
-    if username not in user_history:
-        user_history[username] = []
-    
-    history_item = {
-        'type': activity_type,
-        'content_preview': content[:100] + ('...' if len(content) > 100 else ''),
-        'result': result,
-        'timestamp': datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S UTC')
-    }
-    user_history[username].insert(0, history_item)
-
-def extract_text_from_file(file):
-    filename = file.filename
+    return user_history.add(username, activity_type, content, result)
+
+@metrics.timed('parse_json')
+def parse_json_response(text):
+    return json.loads(text.strip().replace('```json', '').replace('```', ''))
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def service_unavailable(error):
+    """503 with Retry-After for calls refused while the Gemini circuit breaker is open."""
+    retry_after = max(1, math.ceil(error.retry_after))
+    response = jsonify({'error': str(error), 'retry_after': retry_after})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+def load_document(data, filename):
     if not filename or not filename.lower().endswith(('.txt', '.pdf')):
         return None, "Unsupported file type."
-    file.seek(0)
-    text = ""
     try:
-        if filename.lower().endswith('.txt'):
-            text = file.read().decode('utf-8')
-        elif filename.lower().endswith('.pdf'):
-            with pdfplumber.open(io.BytesIO(file.read())) as pdf:
-                for page in pdf.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text + "\n"
-        if not text.strip():
-            return None, "Could not extract any text from the document."
-        return text, None
+        document = document_store.add(data, filename)
+    except extraction.ExtractionError as e:
+        return None, str(e)
     except Exception as e:
         logging.error(f"File extraction failed for {filename}: {str(e)}")
         return None, "Failed to process the file."
+    if not document['text'].strip():
+        return None, "Could not extract any text from the document."
+    return document, None
+
+def prompt_text(document, text=None):
+    """Text to put in a prompt: the stored document's normalized text, or pasted text normalized the same way."""
+    if document is not None:
+        return document['prompt_text']
+    if not text:
+        return text
+    text, stats = normalization.normalize_text(text)
+    normalization.log_stats('pasted text', stats)
+    return text
 
-def run_translation_task(task_id, user_id, content, languages, is_file):
+def document_from_request():
+    """Resolve the uploaded file or a previously returned document_id; (None, None) if neither was sent."""
+    document_id = request.form.get('document_id') or (request.get_json(silent=True) or {}).get('document_id')
+    if document_id:
+        document = document_store.get(document_id)
+        if not document:
+            return None, "Unknown or expired document_id. Please upload the file again."
+        return document, None
+    if 'file' in request.files and request.files['file'].filename:
+        file = request.files['file']
+        return load_document(file.read(), file.filename)
+    return None, None
+
+def run_translation_task(task_id, user_id, languages, text=None, upload=None):
     try:
-        if is_file:
-            text_to_translate, error = extract_text_from_file(content)
+        if upload is not None:
+            document, error = load_document(*upload)
             if error:
                 raise ValueError(error)
+            text_to_translate = document['prompt_text']
         else:
-            text_to_translate = content
+            text_to_translate = text
 
         language_map = {
             'es': 'Spanish', 'fr': 'French', 'de': 'German',
@@ -117,25 +230,149 @@ def run_translation_task(task_id, user_id, content, languages, is_file):
             'zh-CN': 'Chinese (Simplified)'
         }
         
-        translations = {}
-        model = genai.GenerativeModel('gemini-1.5-flash')
+        chunks = split_into_chunks(text_to_translate, TRANSLATION_CHUNK_TOKENS)
+        if not chunks:
+            raise ValueError("There is no text to translate.")
+        partial = {lang_code: [None] * len(chunks) for lang_code in languages}
+        failed = {lang_code: [] for lang_code in languages}
+        completed = {lang_code: 0 for lang_code in languages}
+        memory_stats = {lang_code: {'segments': 0, 'hits': 0, 'model_calls': 0} for lang_code in languages}
 
-        for lang_code in languages:
+        def publish_progress():
+            translation_tasks.set(task_id, {
+                    'status': 'processing',
+                    'result': None,
+                    'progress': {
+                        'completed_chunks': sum(completed.values()),
+                        'total_chunks': len(chunks) * len(languages),
+                        'languages': {lang_code: {'completed': done, 'total': len(chunks)} for lang_code, done in completed.items()}
+                    },
+                    'partial': {lang_code: list(parts) for lang_code, parts in partial.items()}
+            })
+
+        def translate_whole_chunk(lang_name, index, part_note):
+            prompt = f"Translate the following legal document text{part_note} to {lang_name}. Provide only the translated text as the output:\n\n---\n\n{chunks[index]}"
+            return gemini.generate(prompt)
+
+        def translate_segments(lang_name, part_note, segments):
+            prompt = f"""
+            Translate each segment of the following legal document text{part_note} to {lang_name}.
+            The segments are consecutive sentences of the same document.
+            Return only a JSON array of {len(segments)} strings: the translations, in the same order.
+
+            {json.dumps(segments, ensure_ascii=False, indent=0)}
+            """
+            return parse_json_response(gemini.generate(prompt))
+
+        def translate_chunk(lang_code, index):
+            lang_name = language_map.get(lang_code, lang_code)
+            part_note = f" (part {index + 1} of {len(chunks)})" if len(chunks) > 1 else ""
+            if translation_store is None:
+                return translate_whole_chunk(lang_name, index, part_note), None
+            try:
+                return translation_memory.translate(
+                    translation_store, chunks[index], lang_code,
+                    lambda segments: translate_segments(lang_name, part_note, segments)
+                )
+            except ValueError as e:
+                # The model did not return one translation per segment; nothing is remembered for this chunk.
+                logging.warning(f"Segment translation of chunk {index} to {lang_code} was unusable, translating it whole: {str(e)}")
+                return translate_whole_chunk(lang_name, index, part_note), {'model_calls': 2}
+
+        publish_progress()
+        futures = {
+            llm_executor.submit(translate_chunk, lang_code, index): (lang_code, index)
+            for lang_code in languages for index in range(len(chunks))
+        }
+        for future in as_completed(futures):
+            lang_code, index = futures[future]
             try:
-                lang_name = language_map.get(lang_code, lang_code)
-                prompt = f"Translate the following legal document text to {lang_name}. Provide only the translated text as the output:\n\n---\n\n{text_to_translate}"
-                response = model.generate_content(prompt)
-                translations[lang_code] = {'translated': response.text}
+                partial[lang_code][index], chunk_stats = future.result()
+                for name, value in (chunk_stats or {'model_calls': 1}).items():
+                    memory_stats[lang_code][name] += value
             except Exception as e:
-                logging.error(f"Translation to {lang_code} failed: {str(e)}")
+                logging.error(f"Translation of chunk {index} to {lang_code} failed: {str(e)}")
+                failed[lang_code].append(index)
+            completed[lang_code] += 1
+            publish_progress()
+
+        translations = {}
+        for lang_code in languages:
+            lang_name = language_map.get(lang_code, lang_code)
+            if len(failed[lang_code]) == len(chunks):
                 translations[lang_code] = {'error': f"Translation to {lang_name} failed."}
+                continue
+            # Untranslated sections keep their source text so the rest of the document is not lost.
+            parts = [part if part is not None else chunks[index] for index, part in enumerate(partial[lang_code])]
+            translations[lang_code] = {'translated': join_translated_chunks(chunks, parts)}
+            if failed[lang_code]:
+                translations[lang_code]['failed_chunks'] = sorted(failed[lang_code])
+                translations[lang_code]['warning'] = f"{len(failed[lang_code])} of {len(chunks)} sections could not be translated to {lang_name} and are shown in the original language."
 
-        translation_tasks[task_id] = {'status': 'completed', 'result': {'translations': translations}}
-        add_to_history(user_id, 'Translation', text_to_translate, result={'translations': translations})
+        result = {'translations': translations}
+        if translation_store is not None:
+            result['translation_memory'] = translation_memory.job_report(memory_stats)
+            logging.info(f"Translation job {task_id}: translation memory {result['translation_memory']}")
+        translation_tasks.set(task_id, {'status': 'completed', 'result': result})
+        add_to_history(user_id, 'Translation', text_to_translate, result=result)
 
     except Exception as e:
         logging.error(f"Translation task {task_id} failed entirely: {str(e)}")
-        translation_tasks[task_id] = {'status': 'failed', 'result': {'error': str(e)}}
+        translation_tasks.set(task_id, {'status': 'failed', 'result': {'error': str(e)}})
+
+def celery_translation_kwargs(user_id, languages, text=None, upload=None):
+    if upload is not None:
+        return {'username': user_id, 'content_bytes': upload[0], 'filename': upload[1], 'languages': languages, 'is_file': True}
+    return {'username': user_id, 'content_bytes': text.encode('utf-8'), 'filename': 'text.txt', 'languages': languages, 'is_file': False}
+
+def create_job_engine():
+    if JOB_BACKEND in ('celery', 'celery-memory'):
+        import tasks
+        if JOB_BACKEND == 'celery-memory':
+            use_in_memory_broker(tasks.celery)
+        backend = CeleryBackend({'translate': (tasks.run_translation_task, celery_translation_kwargs)})
+    else:
+        backend = InProcessBackend({'translate': run_translation_task}, workers=JOB_WORKERS, queue_size=JOB_QUEUE_SIZE)
+    return JobEngine(backend, translation_tasks)
+
+job_engine = create_job_engine()
+
+# --- Metrics ---
+metrics.gauge('demystilex_translation_jobs', 'Translation jobs held in the result store.', lambda: len(translation_tasks))
+metrics.gauge('demystilex_translation_jobs_pending', 'Translation jobs queued or running.', lambda: job_engine.stats()['pending'])
+metrics.gauge('demystilex_threads', 'Live threads in this process.', threading.active_count)
+metrics.gauge('demystilex_llm_in_flight', 'Gemini calls currently in flight.', lambda: gemini.limiter.in_flight)
+metrics.gauge('demystilex_llm_circuit_open', '1 while the Gemini circuit breaker is open.', lambda: int(gemini.breaker.state == 'open'))
+metrics.gauge('demystilex_cache_entries', 'Entries held by each in-memory cache.', lambda: {
+    'llm': llm_cache.stats()['memory_entries'],
+    'documents': document_store.stats()['documents'],
+    'chat_index': len(chat_indexes),
+}, labelname='cache')
+if translation_store is not None:
+    metrics.gauge('demystilex_translation_memory_entries', 'Segments held by the translation memory.', lambda: len(translation_store))
+metrics.gauge('demystilex_cache_bytes', 'Bytes held by each size-bounded cache.', lambda: {
+    'documents': document_store.stats()['bytes'],
+    'tts': tts_cache.stats()['bytes'],
+}, labelname='cache')
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_time(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        metrics.HTTP_SECONDS.observe(time.perf_counter() - started, endpoint=request.endpoint or 'unmatched',
+                                     method=request.method, status=response.status_code)
+    return response
+
+@app.route('/metrics')
+def metrics_endpoint():
+    # Prometheus scrapes without a session; set METRICS_TOKEN to require a bearer token.
+    if METRICS_TOKEN and request.headers.get('Authorization') != f"Bearer {METRICS_TOKEN}":
+        return jsonify({'error': 'Unauthorized'}), 401
+    return Response(metrics.registry.render(), mimetype='text/plain; version=0.0.4')
 
 # --- Frontend & Auth Routes ---
 @app.route('/')
@@ -211,71 +448,222 @@ def logout():
     return redirect(url_for('login'))
 
 # --- API Routes ---
+def set_document_context(text):
+    index_id = document_id_for(text.encode('utf-8'))
+    chat_indexes.build(index_id, text)
+    session['document_context'] = text
+    session['document_index_id'] = index_id
+
+@metrics.timed('retrieval')
+def select_chat_context(document_context, question, mode=None, top_k=None):
+    mode = mode or CHAT_CONTEXT_MODE
+    top_k = CHAT_TOP_K if top_k is None else top_k
+    if mode == 'full':
+        return document_context
+    # Rebuild from the session text if the index was evicted or the server restarted.
+    index_id = session.get('document_index_id') or document_id_for(document_context.encode('utf-8'))
+    index = chat_indexes.build(index_id, document_context)
+    if len(index.chunks) <= top_k:
+        return document_context
+    hits = index.search(question, top_k)
+    if not hits:
+        # Nothing lexically relevant (e.g. "summarize this"), so fall back to the full document.
+        return document_context
+    return "\n[...]\n".join(index.chunks[i].strip() for i in sorted(i for i, _ in hits))
+
+def build_demystify_prompts(text):
+    explanation_prompt = f"Explain the following legal text in simple, clear terms for a non-lawyer:\n\n{text}"
+    mindmap_prompt = f"""Analyze the legal text and generate a concise mind map as a JSON object. Focus on the 4-6 most critical themes. The JSON must have a 'title' and a 'children' array. Example: {{"title": "Summary", "children": [{{"title": "Theme 1"}}]}}. Provide only the JSON object. Text:\n\n{text}"""
+    return explanation_prompt, mindmap_prompt
+
 @app.route('/api/demystify', methods=['POST'])
 @login_required
 def demystify_api():
-    text, error = extract_text_from_file(request.files['file']) if 'file' in request.files and request.files['file'].filename else (request.form.get('text'), None)
+    document, error = document_from_request()
+    text = prompt_text(document, request.form.get('text'))
     if error or not text:
         return jsonify({'error': error or 'No text or file provided'}), 400
     try:
-        model = genai.GenerativeModel('gemini-1.5-flash')
-        explanation_prompt = f"Explain the following legal text in simple, clear terms for a non-lawyer:\n\n{text}"
-        explanation_response = model.generate_content(explanation_prompt)
-        mindmap_prompt = f"""Analyze the legal text and generate a concise mind map as a JSON object. Focus on the 4-6 most critical themes. The JSON must have a 'title' and a 'children' array. Example: {{"title": "Summary", "children": [{{"title": "Theme 1"}}]}}. Provide only the JSON object. Text:\n\n{text}"""
-        mindmap_response = model.generate_content(mindmap_prompt)
-        mindmap_data = json.loads(mindmap_response.text.strip().replace('```json', '').replace('```', ''))
+        explanation_prompt, mindmap_prompt = build_demystify_prompts(text)
+        # Both prompts only depend on the text, so run them side by side.
+        explanation_future = llm_executor.submit(gemini.generate, explanation_prompt)
+        mindmap_future = llm_executor.submit(gemini.generate, mindmap_prompt)
+        explanation = explanation_future.result()
+        mindmap_data = parse_json_response(mindmap_future.result())
         
-        session['document_context'] = text
-        add_to_history(current_user.id, 'Demystification', text, result={'explanation': explanation_response.text})
+        set_document_context(text)
+        add_to_history(current_user.id, 'Demystification', text, result={'explanation': explanation})
 
-        return jsonify({'explanation': explanation_response.text, 'mindmap_data': mindmap_data})
+        return jsonify({
+            'explanation': explanation,
+            'mindmap_data': mindmap_data,
+            'document_id': document['document_id'] if document else None
+        })
+    except CircuitOpenError as e:
+        return service_unavailable(e)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/demystify/stream', methods=['POST'])
+@login_required
+def demystify_stream_api():
+    document, error = document_from_request()
+    text = prompt_text(document, request.form.get('text'))
+    if error or not text:
+        return jsonify({'error': error or 'No text or file provided'}), 400
+
+    explanation_prompt, mindmap_prompt = build_demystify_prompts(text)
+    mindmap_future = llm_executor.submit(gemini.generate, mindmap_prompt)
+    # The session is saved before the body streams, so set the chat context now.
+    set_document_context(text)
+    user_id = current_user.id
+
+    def generate():
+        yield sse_event('meta', {'document_id': document['document_id'] if document else None})
+        parts = []
+        try:
+            for part in gemini.stream(explanation_prompt):
+                parts.append(part)
+                yield sse_event('explanation', {'text': part})
+        except Exception as e:
+            logging.error(f"Streaming explanation failed: {str(e)}")
+            mindmap_future.cancel()
+            error = {'error': str(e)}
+            if isinstance(e, CircuitOpenError):
+                # The 200 status has already been sent, so the retry hint travels in the event.
+                error['retry_after'] = max(1, math.ceil(e.retry_after))
+            yield sse_event('error', error)
+            return
+        explanation = ''.join(parts)
+        add_to_history(user_id, 'Demystification', text, result={'explanation': explanation})
+        try:
+            yield sse_event('mindmap', {'mindmap_data': parse_json_response(mindmap_future.result())})
+        except Exception as e:
+            logging.error(f"Mind map generation failed: {str(e)}")
+            yield sse_event('mindmap', {'mindmap_data': None, 'error': str(e)})
+        yield sse_event('done', {})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @app.route('/api/translate', methods=['POST'])
 @login_required
 def translate_api():
-    is_file = 'file' in request.files and request.files['file'].filename != ''
+    upload = None
+    text = None
+    document_id = None
     try:
-        if is_file:
+        if request.files.get('file') and request.files['file'].filename:
             content_file = request.files['file']
-            content_bytes = content_file.read()
-            content = io.BytesIO(content_bytes)
-            content.filename = content_file.filename
+            upload = (content_file.read(), content_file.filename)
+            document_id = document_id_for(upload[0])
+            languages = json.loads(request.form.get('languages', '[]'))
+        elif request.form.get('document_id'):
+            document_id = request.form['document_id']
             languages = json.loads(request.form.get('languages', '[]'))
         else:
             data = request.get_json()
-            content = data.get('text', '')
+            text = prompt_text(None, data.get('text', ''))
+            document_id = data.get('document_id')
             languages = data.get('languages', [])
-    except (json.JSONDecodeError, KeyError): 
+    except (json.JSONDecodeError, KeyError, AttributeError): 
         return jsonify({'error': 'Invalid request format.'}), 400
+
+    if upload is None and document_id:
+        document = document_store.get(document_id)
+        if not document:
+            return jsonify({'error': 'Unknown or expired document_id. Please upload the file again.'}), 400
+        text = document['prompt_text']
         
-    if not (content if isinstance(content, str) else content.filename) or not languages: 
+    if not (text or upload) or not languages: 
         return jsonify({'error': 'Missing content or languages.'}), 400
         
     task_id = str(uuid.uuid4())
-    translation_tasks[task_id] = {'status': 'processing', 'result': None}
-    thread = threading.Thread(target=run_translation_task, args=(task_id, current_user.id, content, languages, is_file))
-    thread.start()
+    try:
+        job_engine.submit('translate', task_id, user_id=current_user.id, languages=languages, text=text, upload=upload)
+    except JobQueueFull:
+        return jsonify({'error': 'The server is busy with other translations. Please try again shortly.'}), 429, {'Retry-After': '30'}
     
-    return jsonify({'task_id': task_id}), 202
+    return jsonify({'task_id': task_id, 'document_id': document_id}), 202
 
 @app.route('/api/translation_status/<task_id>')
 @login_required
 def get_translation_status(task_id):
-    task = translation_tasks.get(task_id)
+    task = job_engine.status(task_id)
     return jsonify(task) if task else (jsonify({'status': 'not_found'}), 404)
 
+@app.route('/api/translation_events/<task_id>')
+@login_required
+def translation_events(task_id):
+    if job_engine.status(task_id) is None:
+        return jsonify({'status': 'not_found'}), 404
+
+    def generate():
+        sent_chunks = set()
+        finished_languages = set()
+        last_entry = None
+        deadline = time.monotonic() + TRANSLATION_STREAM_TIMEOUT
+        while True:
+            if last_entry is None:
+                entry = job_engine.status(task_id)
+            else:
+                remaining = deadline - time.monotonic()
+                entry = job_engine.wait_for_change(task_id, last_entry, min(TRANSLATION_STREAM_HEARTBEAT, max(0, remaining)))
+            if entry is None:
+                yield sse_event('failed', {'status': 'not_found'})
+                return
+            if entry is last_entry:
+                if time.monotonic() >= deadline:
+                    yield sse_event('timeout', {'status': entry['status']})
+                    return
+                yield ": heartbeat\n\n"
+                continue
+            last_entry = entry
+
+            if entry['status'] != 'processing':
+                yield sse_event(entry['status'], entry)
+                return
+            # Only push what changed since the last event: new chunks and newly finished languages.
+            for lang_code, parts in (entry.get('partial') or {}).items():
+                for index, part in enumerate(parts):
+                    if part is not None and (lang_code, index) not in sent_chunks:
+                        sent_chunks.add((lang_code, index))
+                        yield sse_event('chunk', {'language': lang_code, 'index': index, 'text': part})
+            progress = entry.get('progress')
+            if progress:
+                for lang_code, counts in progress.get('languages', {}).items():
+                    if counts['completed'] == counts['total'] and lang_code not in finished_languages:
+                        finished_languages.add(lang_code)
+                        yield sse_event('language', {'language': lang_code})
+                yield sse_event('progress', progress)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @app.route('/api/chat', methods=['POST'])
 @login_required
 def chat_api():
-    question = request.get_json().get('question')
+    data = request.get_json()
+    question = data.get('question')
     if not question:
         return jsonify({'error': 'No question provided'}), 400
     
     document_context = session.get('document_context')
     
     if document_context:
+        try:
+            top_k = int(data['top_k']) if data.get('top_k') is not None else None
+        except (TypeError, ValueError):
+            return jsonify({'error': 'top_k must be an integer.'}), 400
+        if top_k is not None and not 1 <= top_k <= CHAT_MAX_TOP_K:
+            return jsonify({'error': f'top_k must be between 1 and {CHAT_MAX_TOP_K}.'}), 400
+        document_context = select_chat_context(document_context, question, data.get('context_mode'), top_k)
         prompt = f"""
         SYSTEM INSTRUCTION:
         You are 'LexiCounsel', a specialized AI legal assistant. Your sole purpose is to analyze and answer questions based *strictly* on the legal document provided by the user.
@@ -298,77 +686,215 @@ def chat_api():
         """
         
     try:
-        model = genai.GenerativeModel('gemini-1.5-flash')
-        response = model.generate_content(prompt)
-        return jsonify({'response': response.text})
+        return jsonify({'response': gemini.generate(prompt)})
+    except CircuitOpenError as e:
+        return service_unavailable(e)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def stream_synthesis(synthesis):
+    # Start playback as soon as the first chunk is ready and stream the rest.
+    audio = synthesis.iter_audio()
+    first_chunk = next(audio)
+    def generate():
+        yield first_chunk
+        yield from audio
+    return Response(stream_with_context(generate()), mimetype='audio/mpeg', headers={'Cache-Control': 'no-cache'})
+
+def send_cached_audio(filepath):
+    # conditional=True gives If-None-Match and Range support on GET requests. The file name is
+    # a content hash, so it doubles as a stable ETag even though LRU touches change the mtime.
+    audio_id = os.path.splitext(os.path.basename(filepath))[0]
+    return send_file(filepath, mimetype='audio/mpeg', conditional=True, etag=audio_id, max_age=86400)
+
 @app.route('/api/speak', methods=['POST'])
 @login_required
 def speak_api():
-    text = request.get_json().get('text')
+    data = request.get_json()
+    text = data.get('text')
+    lang = data.get('lang', 'en')
     if not text:
         return jsonify({'error': 'No text provided'}), 400
+    if not isinstance(lang, str) or not LANG_CODE.fullmatch(lang):
+        return jsonify({'error': 'Invalid language code'}), 400
 
     try:
-        text_hash = hashlib.md5(text.encode('utf-8')).hexdigest()
-        filename = f"{text_hash}.mp3"
-        filepath = os.path.join(TTS_CACHE_DIR, filename)
+        audio_id, _ = tts_cache.path_for(text, lang)
+        filepath = tts_cache.lookup(text, lang)
+        synthesis = tts_cache.start(text, lang) if not filepath else None
 
-        if not os.path.exists(filepath):
-            tts = gTTS(text=text, lang='en', slow=False)
-            tts.save(filepath)
-        
-        return send_file(filepath, mimetype='audio/mpeg')
+        if data.get('response') == 'url':
+            # The browser fetches the audio with GET, so it can use Range requests and its cache.
+            return jsonify({'audio_url': url_for('speak_audio', audio_id=audio_id)})
+
+        if synthesis is not None and len(synthesis.chunks) > 1:
+            return stream_synthesis(synthesis)
+        if synthesis is not None:
+            filepath = synthesis.wait()
+        elif not filepath:
+            filepath = tts_cache.synthesize(text, lang)
+        return send_cached_audio(filepath)
 
     except Exception as e:
         logging.error(f"Text-to-speech generation failed: {str(e)}")
         return jsonify({'error': f'Failed to generate audio: {str(e)}'}), 500
 
+@app.route('/api/speak/<audio_id>')
+@login_required
+def speak_audio(audio_id):
+    if not re.fullmatch(rf'[0-9a-f]{{32}}(-{LANG_CODE.pattern})?', audio_id):
+        return jsonify({'error': 'Not found'}), 404
+    try:
+        filepath = tts_cache.lookup_key(audio_id)
+        if filepath:
+            return send_cached_audio(filepath)
+        synthesis = tts_cache.inflight(audio_id)
+        if synthesis is None:
+            return jsonify({'error': 'Not found'}), 404
+        return stream_synthesis(synthesis)
+    except Exception as e:
+        logging.error(f"Text-to-speech generation failed: {str(e)}")
+        return jsonify({'error': f'Failed to generate audio: {str(e)}'}), 500
+
 @app.route('/api/history')
 @login_required
 def get_history():
-    return jsonify(user_history.get(current_user.id, []))
+    try:
+        limit = min(max(int(request.args.get('limit', 20)), 1), 100)
+        cursor = int(request.args['cursor']) if request.args.get('cursor') else None
+    except ValueError:
+        return jsonify({'error': 'limit and cursor must be integers.'}), 400
+    items, next_cursor = user_history.page(current_user.id, limit=limit, cursor=cursor)
+    return jsonify({'items': items, 'next_cursor': next_cursor})
+
+@app.route('/api/history/<int:item_id>')
+@login_required
+def get_history_result(item_id):
+    result = user_history.get_result(current_user.id, item_id)
+    return jsonify({'id': item_id, 'result': result}) if result is not None else (jsonify({'error': 'Not found'}), 404)
+
+@app.route('/api/cache_stats')
+@login_required
+def cache_stats():
+    return jsonify(llm_cache.stats())
 
 @app.route('/api/clear_context', methods=['POST'])
 @login_required
 def clear_context():
     session.pop('document_context', None)
+    session.pop('document_index_id', None)
     return jsonify({'message': 'Context cleared'}), 200
 
+@app.route('/api/documents', methods=['POST'])
+@login_required
+def upload_document_api():
+    if 'file' not in request.files or not request.files['file'].filename:
+        return jsonify({'error': 'No file was provided.'}), 400
+    file = request.files['file']
+    document, error = load_document(file.read(), file.filename)
+    if error:
+        return jsonify({'error': error}), 400
+    return jsonify({
+        'document_id': document['document_id'],
+        'filename': document['filename'],
+        'page_count': document['page_count'],
+        'characters': len(document['text']),
+        'normalization': document['normalization']
+    })
+
 # --- Legal Tools API Routes ---
 @app.route('/api/verify_estamp', methods=['POST'])
 @login_required
 def verify_estamp_api():
-    text, error = extract_text_from_file(request.files['file']) if 'file' in request.files else (None, "A file is required.")
-    if error or not text:
-        return jsonify({'error': error or 'No text found in file'}), 400
-
-    uin_pattern = r'IN-[A-Z]{2}\d{12}[A-Z]'
-    match = re.search(uin_pattern, text)
+    document_id = request.form.get('document_id')
+    try:
+        if document_id:
+            document = document_store.get(document_id)
+            if not document:
+                return jsonify({'error': 'Unknown or expired document_id. Please upload the file again.'}), 400
+            uin, page = estamp.find_uin_in_text(document['text'], document['page_offsets'])
+        elif request.files.get('file') and request.files['file'].filename:
+            file = request.files['file']
+            data = file.read()
+            document = document_store.get(document_id_for(data))
+            if document:
+                uin, page = estamp.find_uin_in_text(document['text'], document['page_offsets'])
+            else:
+                # The stamp certificate is nearly always on the first page or two, so stop at the first hit.
+                uin, page = estamp.find_first_uin(extraction.iter_pages(data, file.filename))
+        else:
+            return jsonify({'error': 'A file is required.'}), 400
+    except extraction.ExtractionError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logging.error(f"E-stamp scan failed: {str(e)}")
+        return jsonify({'error': 'Failed to process the file.'}), 400
 
-    if not match:
+    if not uin:
         return jsonify({'status': 'not_found', 'reason': 'Could not find a valid E-Stamp Number (UIN) in the document.'})
 
-    uin = match.group(0)
-    
     return jsonify({
         'status': 'found',
         'uin': uin,
-        'verification_url': 'https://www.shcilestamp.com/eStamp_en/verifyestamp.jsp'
+        'page': page,
+        'verification_url': estamp.VERIFICATION_URL
     })
 
+@app.route('/api/verify_estamp/batch', methods=['POST'])
+@login_required
+def verify_estamp_batch_api():
+    files = request.files.getlist('files') + request.files.getlist('file')
+    if not any(file.filename for file in files):
+        return jsonify({'error': 'At least one file or .zip archive is required.'}), 400
+    def collect(filename, future, error):
+        if error:
+            return {'filename': filename, 'status': 'error', 'error': error}
+        try:
+            uins = future.result()
+            return {'filename': filename, 'status': 'found' if uins else 'not_found', 'uins': uins}
+        except extraction.ExtractionError as e:
+            return {'filename': filename, 'status': 'error', 'error': str(e)}
+        except Exception as e:
+            logging.error(f"E-stamp scan failed for {filename}: {str(e)}")
+            return {'filename': filename, 'status': 'error', 'error': 'Failed to process the file.'}
+
+    # Files are submitted as they are read, with at most BATCH_IN_FLIGHT waiting, so a large archive
+    # is never held decompressed in memory all at once.
+    pool = extraction.get_pool()
+    pending, results = deque(), []
+    try:
+        for filename, data, error in estamp.iter_batch_files(files):
+            pending.append((filename, pool.submit(estamp.find_all_uins, data, filename) if data is not None else None, error))
+            if len(pending) >= estamp.BATCH_IN_FLIGHT:
+                results.append(collect(*pending.popleft()))
+    except estamp.BatchError as e:
+        for _, future, _ in pending:
+            if future is not None:
+                future.cancel()
+        return jsonify({'error': str(e)}), 400
+    results.extend(collect(*entry) for entry in pending)
+
+    return jsonify({'results': results, 'verification_url': estamp.VERIFICATION_URL})
+
 @app.route('/api/compare_clauses', methods=['POST'])
 @login_required
 def compare_clauses_api():
     data = request.get_json()
-    user_document_text = data.get('text')
+    user_document_text = prompt_text(None, data.get('text'))
     if not user_document_text:
         return jsonify({'error': 'Document text is required.'}), 400
 
+    # Local pre-screen: one pass over the text finds present/missing standard clauses and risky wording.
+    screening = clause_detector.analyze(user_document_text)
+    fast_result = dict(clause_detector.fast_report(screening), mode='fast')
+    if data.get('mode') == 'fast':
+        return jsonify(fast_result)
+
     try:
-        model = genai.GenerativeModel('gemini-1.5-flash')
+        flagged_sections = clause_detector.flagged_sections(screening)
+        review_text = "\n".join(f"- {section}" for section in flagged_sections) if flagged_sections else user_document_text
+        present_labels = [clause_detector.clauses[key]['label'] for key in screening['present']]
+        missing_labels = [clause_detector.clauses[key]['label'] for key in screening['missing']]
         prompt = f"""
         You are a legal document analyst. Compare the provided "User's Document" against standard principles for a residential rental agreement in India.
         Analyze and identify three categories, responding in a valid JSON format.
@@ -376,17 +902,19 @@ def compare_clauses_api():
         2.  "risky_clauses": A list of clauses present that seem unfair or risky for a tenant.
         3.  "summary": A brief, one-paragraph overall assessment of the document.
         Standard Principles: Clearly defined parties, property, term, rent, deposit, a reasonable notice period (1-2 months), maintenance responsibilities.
-        User's Document:\n---\n{user_document_text}\n---
+        An automated keyword pre-screen has already been run. Confirm or correct its findings using the flagged sections below, which are the only parts of the document you need to review.
+        Pre-screen - clauses found: {', '.join(present_labels) or 'none'}.
+        Pre-screen - clauses not found: {', '.join(missing_labels) or 'none'}.
+        User's Document (flagged sections):\n---\n{review_text}\n---
         Provide a single, valid JSON object with the keys "missing_clauses", "risky_clauses", and "summary".
         """
-        response = model.generate_content(prompt)
-        cleaned_response = response.text.strip().replace('```json', '').replace('```', '')
-        analysis_result = json.loads(cleaned_response)
+        analysis_result = parse_json_response(gemini.generate(prompt))
         return jsonify(analysis_result)
         
     except Exception as e:
-        logging.error(f"Clause comparison failed: {str(e)}")
-        return jsonify({'error': f'AI analysis failed: {str(e)}'}), 500
+        # The offline result is still useful when the model is unavailable.
+        logging.error(f"Clause comparison failed, returning the offline pre-screen: {str(e)}")
+        return jsonify(dict(fast_result, warning=f'AI analysis failed, showing the automated pre-screen instead: {str(e)}'))
 
 @app.route('/api/draft_clause', methods=['POST'])
 @login_required
@@ -397,17 +925,18 @@ def draft_clause_api():
         return jsonify({'error': 'Clause description is required.'}), 400
 
     try:
-        model = genai.GenerativeModel('gemini-1.5-flash')
         prompt = f"""
         As a legal assistant, draft a standard, clear, and fair legal clause for a rental agreement based on the following user request.
         The clause should be legally sound for a typical residential tenancy in India.
         Provide only the numbered clause text as the output.
         User Request: "{description}"
         """
-        response = model.generate_content(prompt)
+        clause_text = gemini.generate(prompt)
         clause_number_prefix = "4." 
-        return jsonify({'clause': f"{clause_number_prefix} {response.text.strip()}"})
+        return jsonify({'clause': f"{clause_number_prefix} {clause_text.strip()}"})
 
+    except CircuitOpenError as e:
+        return service_unavailable(e)
     except Exception as e:
         logging.error(f"Clause drafting failed: {str(e)}")
         return jsonify({'error': f'AI clause drafting failed: {str(e)}'}), 500
@@ -415,86 +944,108 @@ def draft_clause_api():
 @app.route('/draft_pdf', methods=['POST'])
 @login_required
 def draft_pdf_route():
-    data = request.form
-    additional_clauses = data.get('additional_clauses', '')
-
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_font("Helvetica", "B", 16)
-    pdf.cell(0, 10, "RENTAL AGREEMENT", ln=True, align='C')
-    pdf.ln(10)
-
-    pdf.set_font("Helvetica", "", 12)
-    pdf.multi_cell(0, 8, f"This Rental Agreement is made on this day, {data.get('agreement_date', '_________')},", ln=True)
-    pdf.ln(5)
-    pdf.multi_cell(0, 8, f"BETWEEN: {data.get('landlord_name', '[Landlord Name]')} (hereinafter referred to as the \"LANDLORD\").", ln=True)
-    pdf.ln(5)
-    pdf.multi_cell(0, 8, f"AND: {data.get('tenant_name', '[Tenant Name]')} (hereinafter referred to as the \"TENANT\").", ln=True)
-    pdf.ln(10)
-    pdf.multi_cell(0, 8, f"The landlord agrees to rent to the tenant the property located at: {data.get('property_address', '[Property Address]')}.", ln=True)
-    pdf.ln(10)
-
-    pdf.set_font("Helvetica", "B", 12)
-    pdf.multi_cell(0, 8, f"1. TERM: The term of this lease shall be for {data.get('term_months', 11)} months.", ln=True)
-    pdf.multi_cell(0, 8, f"2. RENT: The monthly rent shall be Rs. {data.get('rent_amount', 0)}/-.", ln=True)
-    pdf.multi_cell(0, 8, f"3. DEPOSIT: The tenant has paid a security deposit of Rs. {data.get('deposit_amount', 0)}/-.", ln=True)
-    
-    if additional_clauses:
-        pdf.ln(5)
-        pdf.set_font("Helvetica", "", 12)
-        pdf.multi_cell(0, 8, additional_clauses, ln=True)
-
-    pdf.ln(20)
-    pdf.multi_cell(0, 8, "IN WITNESS WHEREOF, the parties have executed this agreement.", ln=True)
-    pdf.ln(20)
-
-    pdf.multi_cell(0, 8, "_________________________")
-    pdf.multi_cell(0, 8, f"LANDLORD ({data.get('landlord_name', '')})", ln=True)
-    pdf.ln(20)
-    pdf.multi_cell(0, 8, "_________________________")
-    pdf.multi_cell(0, 8, f"TENANT ({data.get('tenant_name', '')})", ln=True)
-
-    buffer = BytesIO()
-    pdf.output(buffer)
-    buffer.seek(0)
-
+    try:
+        pdf_bytes = agreement_pdf.render_agreement(request.form)
+    except agreement_pdf.BatchError as e:
+        return jsonify({'error': str(e)}), 400
     return send_file(
-        buffer,
+        BytesIO(pdf_bytes),
         as_attachment=True,
         download_name="Rental_Agreement.pdf",
         mimetype="application/pdf"
     )
 
+@app.route('/api/draft_pdf/batch', methods=['POST'])
+@login_required
+def draft_pdf_batch_api():
+    """Render many agreements from CSV/JSON rows into a streamed ZIP."""
+    try:
+        rows = agreement_pdf.parse_batch_rows(request.files.get('file'), request.get_json(silent=True))
+    except agreement_pdf.BatchError as e:
+        return jsonify({'error': str(e)}), 400
+
+    entries = list(zip(agreement_pdf.batch_filenames(rows), rows))
+    size = agreement_pdf.BATCH_CHUNK_ROWS
+    pool = agreement_pdf.get_pool()
+    futures = [pool.submit(agreement_pdf.render_many, entries[i:i + size]) for i in range(0, len(entries), size)]
+
+    def rendered():
+        errors = []
+        try:
+            for future in futures:
+                for filename, data, error in future.result():
+                    if error:
+                        errors.append(f"{filename}: {error}")
+                    else:
+                        yield filename, data
+            if errors:
+                logging.warning(f"{len(errors)} of {len(entries)} batch agreements failed to render")
+                # The rest of the archive is still useful, so failed rows are listed instead of aborting it.
+                yield 'errors.txt', '\n'.join(errors).encode('utf-8')
+        except Exception as e:
+            logging.error(f"Batch agreement rendering failed: {str(e)}")
+            raise
+        finally:
+            # Stop any chunks not yet started if the client disconnects or a render fails.
+            for future in futures:
+                future.cancel()
+
+    add_to_history(current_user.id, 'Agreement Batch', f"{len(rows)} rental agreements")
+    return Response(
+        stream_with_context(agreement_pdf.iter_zip(rendered())),
+        mimetype='application/zip',
+        headers={'Content-Disposition': 'attachment; filename="Rental_Agreements.zip"'}
+    )
+
 @app.route('/api/extract_key_dates', methods=['POST'])
 @login_required
 def extract_key_dates_api():
-    if 'file' not in request.files or not request.files['file'].filename:
+    document, error = document_from_request()
+    if not document and not error:
         return jsonify({'error': 'No file was provided.'}), 400
-        
-    text, error = extract_text_from_file(request.files['file'])
+    text = document['prompt_text'] if document else None
     if error or not text:
         return jsonify({'error': error or 'No text or file provided'}), 400
 
+    # Local pre-pass: only the sentences that contain a date expression are sent to the model.
+    candidates = date_extractor.find_date_candidates(text)
+    offline_result = date_extractor.resolve_offline(candidates)
+    mode = request.form.get('mode') or (request.get_json(silent=True) or {}).get('mode')
+    if mode == 'offline' or not candidates:
+        return jsonify({'key_dates': offline_result, 'mode': 'offline'})
+
     try:
-        model = genai.GenerativeModel('gemini-1.5-flash')
+        windows = []
+        for candidate in candidates:
+            if candidate['context'] not in windows:
+                windows.append(candidate['context'])
+        date_lines = "\n".join(
+            f"- \"{item['source_text']}\" (parsed as {item['date']})" for item in offline_result
+        )
         prompt = f"""
-        Analyze the following legal document and extract all key dates.
+        Analyze the following excerpts from a legal document and extract all key dates.
         For each date found, identify its legal significance (e.g., "Agreement Start Date", "Lease Expiry Date", "Notice Date").
+        Relative periods (e.g., "eleven months from the date of commencement") should be resolved to a calendar date where the excerpts allow it.
         Provide the result as a single, valid JSON array of objects, where each object has a "date" and a "significance" key.
         Example: [{{"date": "2024-01-01", "significance": "Effective Start Date"}}]
 
-        --- DOCUMENT TEXT ---
-        {text}
+        --- DATE EXPRESSIONS FOUND ---
+        {date_lines}
+
+        --- EXCERPTS ---
+        {chr(10).join(windows)}
         """
-        response = model.generate_content(prompt)
-        cleaned_response = response.text.strip().replace('```json', '').replace('```', '')
-        dates_result = json.loads(cleaned_response)
+        dates_result = parse_json_response(gemini.generate(prompt))
         
         return jsonify({'key_dates': dates_result})
         
     except Exception as e:
-        logging.error(f"Key date extraction failed: {str(e)}")
-        return jsonify({'error': f'AI date extraction failed: {str(e)}'}), 500
+        logging.error(f"Key date extraction failed, returning the offline dates: {str(e)}")
+        return jsonify({'key_dates': offline_result, 'mode': 'offline',
+                        'warning': f'AI date extraction failed, showing locally parsed dates instead: {str(e)}'})
+
+startup.record('app', time.perf_counter() - BOOT_STARTED)
+startup.report()
 
 if __name__ == '__main__':
     app.run(host='127.0.0.1', port=5000, debug=True)
\ No newline at end of file
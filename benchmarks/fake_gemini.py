@@ -0,0 +1,103 @@
+# benchmarks/fake_gemini.py
+import json
+import random
+import threading
+import time
+
+from google.api_core.exceptions import ServiceUnavailable
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeGemini:
+    """Local stand-in for GenerativeModel.generate_content with configurable latency, errors and output size."""
+
+    def __init__(self, latency=0.2, jitter=0.05, error_rate=0.0, output_chars=800, stream_chunks=8, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.output_chars = output_chars
+        self.stream_chunks = stream_chunks
+        self.calls = 0
+        self.errors = 0
+        self.prompt_chars = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def install(self):
+        import google.generativeai as genai
+        fake = self
+
+        def generate_content(model, prompt, *args, **kwargs):
+            return fake.respond(prompt, stream=kwargs.get('stream', False))
+
+        genai.GenerativeModel.generate_content = generate_content
+        return self
+
+    def _delay(self):
+        with self._lock:
+            return max(0.0, self._random.gauss(self.latency, self.jitter)), self._random.random() < self.error_rate
+
+    def respond(self, prompt, stream=False):
+        delay, fail = self._delay()
+        with self._lock:
+            self.calls += 1
+            self.prompt_chars += len(prompt)
+            if fail:
+                self.errors += 1
+        text = self._output_for(prompt)
+        if not stream:
+            time.sleep(delay)
+            if fail:
+                raise ServiceUnavailable("Fake Gemini: simulated upstream error")
+            return FakeResponse(text)
+        return self._stream(text, delay, fail)
+
+    def _stream(self, text, delay, fail):
+        # Time to first token is a third of the latency; the rest is spread over the chunks.
+        time.sleep(delay / 3)
+        if fail:
+            raise ServiceUnavailable("Fake Gemini: simulated upstream error")
+        size = max(1, -(-len(text) // self.stream_chunks))
+        for start in range(0, len(text), size):
+            time.sleep(delay * 2 / 3 / self.stream_chunks)
+            yield FakeResponse(text[start:start + size])
+
+    def _filler(self, chars):
+        sentence = "The tenant shall pay the rent on time and keep the premises in good repair. "
+        return (sentence * (chars // len(sentence) + 1))[:chars]
+
+    def _output_for(self, prompt):
+        # Shape the output like the real model would for each prompt the app sends.
+        if 'mind map' in prompt:
+            children = [{'title': f"Point {i}", 'children': [{'title': self._filler(40)}]} for i in range(5)]
+            return json.dumps({'title': 'Rental Agreement', 'children': children})
+        if 'translations, in the same order' in prompt:
+            # Segment batches from the translation memory: one translation per input segment.
+            segments = json.loads(prompt[prompt.index('['):prompt.rindex(']') + 1])
+            return json.dumps([f"[translated] {segment}" for segment in segments], ensure_ascii=False)
+        if 'JSON array' in prompt:
+            return json.dumps([{'date': '2024-01-01', 'significance': 'Agreement Start Date'},
+                               {'date': '2024-12-01', 'significance': 'Lease Expiry Date'}])
+        if '"missing_clauses"' in prompt:
+            return json.dumps({'missing_clauses': ['Maintenance responsibilities'],
+                               'risky_clauses': [self._filler(120)], 'summary': self._filler(self.output_chars // 2)})
+        return self._filler(self.output_chars)
+
+    def stats(self):
+        with self._lock:
+            return {'calls': self.calls, 'errors': self.errors, 'prompt_chars': self.prompt_chars}
+
+
+def install_fake_tts(latency=0.1, audio_bytes=16 * 1024):
+    """Replace gTTS synthesis with a sleep and silent bytes, so /api/speak needs no network."""
+    import tts
+
+    def synthesize_chunk(text, lang):
+        time.sleep(latency)
+        return b'\xff\xfb\x90\x00' + b'\x00' * max(0, audio_bytes - 4)
+
+    tts.synthesize_chunk = synthesize_chunk
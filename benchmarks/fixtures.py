@@ -0,0 +1,51 @@
+# benchmarks/fixtures.py
+import io
+import zipfile
+
+from fpdf import FPDF
+
+AGREEMENT_PAGE = """This Rental Agreement is made on this 1st day of January, 2024 at Bengaluru.
+BETWEEN: Mr. Ravi Kumar (hereinafter referred to as the "LANDLORD") AND: Ms. Sita Rao (hereinafter referred to as the "TENANT").
+The landlord agrees to let the premises situated at Flat No. 12, MG Road, Bengaluru, measuring 1200 sq ft.
+1. TERM: The tenancy shall commence from 05/01/2024 and is valid for a period of eleven (11) months from the date of commencement.
+2. RENT: The monthly rent of Rs. 25,000/- is payable on or before the 5th day of every month.
+3. DEPOSIT: The tenant has paid an interest free refundable security deposit of Rs. 1,00,000/-.
+4. NOTICE: Either party may terminate this agreement by giving two months' written notice.
+5. MAINTENANCE: Minor repairs shall be borne by the tenant; structural repairs by the landlord.
+6. The landlord may increase the rent at any time at his sole discretion, and the deposit is non-refundable if the tenant leaves during the lock-in period.
+"""
+ESTAMP_LINE = "e-Stamp Certificate No. IN-KA{:012d}W issued by SHCIL.\n"
+
+
+def agreement_text(pages=3, salt=''):
+    # The salt makes each document unique, so cache hits only happen when the benchmark wants them.
+    body = [f"Reference: {salt}\n"] if salt else []
+    for page in range(pages):
+        body.append(AGREEMENT_PAGE.replace('Flat No. 12', f"Flat No. {page + 12}"))
+    return '\f'.join(body)
+
+
+def agreement_txt(pages=3, salt='', uin=None):
+    text = agreement_text(pages, salt)
+    if uin is not None:
+        text += '\f' + ESTAMP_LINE.format(uin)
+    return text.encode('utf-8')
+
+
+def agreement_pdf(pages=3, salt='', uin=None):
+    pdf = FPDF()
+    pdf.set_font('Helvetica', '', 10)
+    for index, page in enumerate(agreement_text(pages, salt).split('\f')):
+        pdf.add_page()
+        pdf.multi_cell(0, 5, page, new_x='LMARGIN', new_y='NEXT')
+        if uin is not None and index == pages - 1:
+            pdf.multi_cell(0, 5, ESTAMP_LINE.format(uin), new_x='LMARGIN', new_y='NEXT')
+    return bytes(pdf.output())
+
+
+def estamp_zip(files):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        for name, data in files:
+            archive.writestr(name, data)
+    return buffer.getvalue()
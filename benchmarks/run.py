@@ -0,0 +1,407 @@
+# benchmarks/run.py
+"""Load-test every /api/* endpoint in-process against a fake Gemini.
+
+    python benchmarks/run.py --concurrency 8 --requests 40 --latency-ms 300
+    python benchmarks/run.py --endpoints demystify,translate --fixture pdf --pages 20 --json report.json
+
+Each endpoint runs as its own phase with `--concurrency` logged-in clients. Documents are
+salted per request unless --cache is given, so caches only help when asked to.
+"""
+import os
+import sys
+import io
+import json
+import time
+import queue
+import argparse
+import tempfile
+import threading
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fixtures
+from fake_gemini import FakeGemini, install_fake_tts
+
+SCENARIOS = {}
+
+
+class Scenario:
+    def __init__(self, name, run, setup=None, documents=False):
+        self.name = name
+        self.run = run
+        self.setup = setup
+        self.documents = documents
+
+
+def scenario(name, setup=None, documents=False):
+    def register(run):
+        SCENARIOS[name] = Scenario(name, run, setup, documents)
+        return run
+    return register
+
+
+class BenchContext:
+    def __init__(self, args):
+        self.args = args
+        self.documents = []
+
+    def make_documents(self, phase):
+        self.documents = []
+        for n in range(self.args.requests):
+            salt = '' if self.args.cache else f"{phase}-{n}-{time.time_ns()}"
+            use_pdf = self.args.fixture == 'pdf' or (self.args.fixture == 'both' and n % 2)
+            if use_pdf:
+                self.documents.append((fixtures.agreement_pdf(self.args.pages, salt, uin=n), f"agreement_{n}.pdf"))
+            else:
+                self.documents.append((fixtures.agreement_txt(self.args.pages, salt, uin=n), f"agreement_{n}.txt"))
+
+    def document(self, n):
+        data, filename = self.documents[n % len(self.documents)]
+        return io.BytesIO(data), filename
+
+    def text(self, n):
+        salt = '' if self.args.cache else f"text-{n}-{time.time_ns()}"
+        return fixtures.agreement_text(self.args.pages, salt)
+
+
+def ok(response, *codes):
+    return response.status_code in (codes or (200,))
+
+
+def read_stream(response, started):
+    # Returns (time to first byte since `started`, body) for a streamed response.
+    first = None
+    body = []
+    for chunk in response.response:
+        if first is None:
+            first = time.perf_counter() - started
+        body.append(chunk if isinstance(chunk, bytes) else chunk.encode())
+    response.close()
+    return first, b''.join(body)
+
+
+# --- Scenarios ---
+@scenario('documents', documents=True)
+def run_documents(client, ctx, n):
+    return ok(client.post('/api/documents', data={'file': ctx.document(n)}, content_type='multipart/form-data'))
+
+
+@scenario('demystify', documents=True)
+def run_demystify(client, ctx, n):
+    return ok(client.post('/api/demystify', data={'file': ctx.document(n)}, content_type='multipart/form-data'))
+
+
+@scenario('demystify_stream', documents=True)
+def run_demystify_stream(client, ctx, n):
+    started = time.perf_counter()
+    response = client.post('/api/demystify/stream', data={'file': ctx.document(n)}, content_type='multipart/form-data', buffered=False)
+    ttfb, body = read_stream(response, started)
+    return response.status_code == 200 and b'event: done' in body, ttfb
+
+
+def submit_translation(client, ctx, n):
+    response = client.post('/api/translate', json={'text': ctx.text(n), 'languages': ctx.args.languages})
+    return response.get_json().get('task_id') if response.status_code == 202 else None
+
+
+@scenario('translate')
+def run_translate(client, ctx, n):
+    task_id = submit_translation(client, ctx, n)
+    deadline = time.monotonic() + ctx.args.timeout
+    while task_id and time.monotonic() < deadline:
+        status = client.get(f'/api/translation_status/{task_id}').get_json().get('status')
+        if status != 'processing':
+            return status == 'completed'
+        time.sleep(0.02)
+    return False
+
+
+@scenario('translation_events')
+def run_translation_events(client, ctx, n):
+    task_id = submit_translation(client, ctx, n)
+    if not task_id:
+        return False
+    started = time.perf_counter()
+    response = client.get(f'/api/translation_events/{task_id}', buffered=False)
+    ttfb, body = read_stream(response, started)
+    return b'event: completed' in body, ttfb
+
+
+def setup_chat(client, ctx):
+    client.post('/api/demystify', data={'text': ctx.text(0)})
+
+
+@scenario('chat', setup=setup_chat)
+def run_chat(client, ctx, n):
+    return ok(client.post('/api/chat', json={'question': f"What is the notice period? ({n})"}))
+
+
+@scenario('speak')
+def run_speak(client, ctx, n):
+    started = time.perf_counter()
+    response = client.post('/api/speak', json={'text': ctx.text(n)[:1500]}, buffered=False)
+    ttfb, body = read_stream(response, started)
+    return response.status_code == 200 and len(body) > 0, ttfb
+
+
+@scenario('speak_url')
+def run_speak_url(client, ctx, n):
+    response = client.post('/api/speak', json={'text': ctx.text(n)[:1500], 'response': 'url'})
+    if response.status_code != 200:
+        return False
+    started = time.perf_counter()
+    audio = client.get(response.get_json()['audio_url'], buffered=False)
+    ttfb, body = read_stream(audio, started)
+    return audio.status_code == 200 and len(body) > 0, ttfb
+
+
+def setup_history(client, ctx):
+    for n in range(3):
+        client.post('/api/draft_clause', json={'description': f"pets allowed {n}"})
+
+
+@scenario('history', setup=setup_history)
+def run_history(client, ctx, n):
+    return ok(client.get('/api/history?limit=20'))
+
+
+@scenario('history_item', setup=setup_history)
+def run_history_item(client, ctx, n):
+    items = client.get('/api/history?limit=1').get_json()['items']
+    return bool(items) and ok(client.get(f"/api/history/{items[0]['id']}"), 200, 404)
+
+
+@scenario('cache_stats')
+def run_cache_stats(client, ctx, n):
+    return ok(client.get('/api/cache_stats'))
+
+
+@scenario('verify_estamp', documents=True)
+def run_verify_estamp(client, ctx, n):
+    return ok(client.post('/api/verify_estamp', data={'file': ctx.document(n)}, content_type='multipart/form-data'))
+
+
+@scenario('verify_estamp_batch', documents=True)
+def run_verify_estamp_batch(client, ctx, n):
+    archive = fixtures.estamp_zip(
+        (filename, data) for data, filename in (ctx.documents[(n + i) % len(ctx.documents)] for i in range(5))
+    )
+    return ok(client.post('/api/verify_estamp/batch', data={'files': (io.BytesIO(archive), f"batch_{n}.zip")},
+                          content_type='multipart/form-data'))
+
+
+@scenario('compare_clauses')
+def run_compare_clauses(client, ctx, n):
+    return ok(client.post('/api/compare_clauses', json={'text': ctx.text(n)}))
+
+
+@scenario('compare_clauses_fast')
+def run_compare_clauses_fast(client, ctx, n):
+    return ok(client.post('/api/compare_clauses', json={'text': ctx.text(n), 'mode': 'fast'}))
+
+
+@scenario('draft_clause')
+def run_draft_clause(client, ctx, n):
+    return ok(client.post('/api/draft_clause', json={'description': f"Tenant may keep one pet ({n})"}))
+
+
+@scenario('draft_pdf')
+def run_draft_pdf(client, ctx, n):
+    return ok(client.post('/draft_pdf', data={'landlord_name': f"Landlord {n}", 'tenant_name': f"Tenant {n}", 'rent_amount': '25000'}))
+
+
+@scenario('draft_pdf_batch')
+def run_draft_pdf_batch(client, ctx, n):
+    rows = [{'landlord_name': f"Landlord {n}", 'tenant_name': f"Tenant {i}", 'rent_amount': 20000 + i} for i in range(ctx.args.batch_rows)]
+    started = time.perf_counter()
+    response = client.post('/api/draft_pdf/batch', json={'rows': rows}, buffered=False)
+    ttfb, body = read_stream(response, started)
+    return response.status_code == 200 and body[:2] == b'PK', ttfb
+
+
+@scenario('extract_key_dates', documents=True)
+def run_extract_key_dates(client, ctx, n):
+    return ok(client.post('/api/extract_key_dates', data={'file': ctx.document(n)}, content_type='multipart/form-data'))
+
+
+@scenario('extract_key_dates_offline', documents=True)
+def run_extract_key_dates_offline(client, ctx, n):
+    return ok(client.post('/api/extract_key_dates', data={'file': ctx.document(n), 'mode': 'offline'}, content_type='multipart/form-data'))
+
+
+@scenario('clear_context')
+def run_clear_context(client, ctx, n):
+    return ok(client.post('/api/clear_context'))
+
+
+# --- Runner ---
+def rss_mb():
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))]
+
+
+def login(app):
+    client = app.test_client()
+    client.post('/login', data={'username': 'user1', 'password': 'password123'})
+    return client
+
+
+def run_phase(app, ctx, item):
+    args = ctx.args
+    if item.documents:
+        ctx.make_documents(item.name)
+    clients = queue.Queue()
+    for _ in range(args.concurrency):
+        client = login(app)
+        if item.setup:
+            item.setup(client, ctx)
+        clients.put(client)
+
+    latencies, ttfbs, failures = [], [], []
+    lock = threading.Lock()
+
+    def one(n):
+        client = clients.get()
+        start = time.perf_counter()
+        try:
+            result = item.run(client, ctx, n)
+        except Exception as e:
+            result = False
+            with lock:
+                failures.append(repr(e))
+        finally:
+            elapsed = time.perf_counter() - start
+            clients.put(client)
+        passed, ttfb = result if isinstance(result, tuple) else (result, None)
+        with lock:
+            latencies.append(elapsed)
+            if ttfb is not None:
+                ttfbs.append(ttfb)
+            if not passed:
+                failures.append('failed')
+
+    rss_before = rss_mb()
+    if args.tracemalloc:
+        tracemalloc.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        list(executor.map(one, range(args.requests)))
+    wall = time.perf_counter() - started
+    peak_mb = None
+    if args.tracemalloc:
+        peak_mb = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+        tracemalloc.stop()
+
+    ms = lambda value: round(value * 1000, 1) if value is not None else None
+    return {
+        'requests': len(latencies),
+        'errors': len(failures),
+        'throughput_rps': round(len(latencies) / wall, 2) if wall else None,
+        'p50_ms': ms(percentile(latencies, 50)),
+        'p95_ms': ms(percentile(latencies, 95)),
+        'p99_ms': ms(percentile(latencies, 99)),
+        'ttfb_p50_ms': ms(percentile(ttfbs, 50)),
+        'rss_mb': round(rss_mb(), 1),
+        'rss_delta_mb': round(rss_mb() - rss_before, 1),
+        'py_peak_mb': round(peak_mb, 1) if peak_mb is not None else None,
+        'sample_errors': sorted(set(failures))[:3],
+    }
+
+
+def print_table(results):
+    columns = ['requests', 'errors', 'throughput_rps', 'p50_ms', 'p95_ms', 'p99_ms', 'ttfb_p50_ms', 'rss_mb', 'rss_delta_mb', 'py_peak_mb']
+    width = max(len(name) for name in results) + 2
+    print('endpoint'.ljust(width) + ''.join(column.rjust(15) for column in columns))
+    for name, result in results.items():
+        print(name.ljust(width) + ''.join(str(result[column] if result[column] is not None else '-').rjust(15) for column in columns))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--endpoints', default='all', help=f"Comma-separated scenarios or 'all': {', '.join(SCENARIOS)}")
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=20, help='Requests per endpoint.')
+    parser.add_argument('--fixture', choices=['txt', 'pdf', 'both'], default='both')
+    parser.add_argument('--pages', type=int, default=3, help='Pages per fixture document.')
+    parser.add_argument('--languages', default='hi,fr', help='Target languages for translation scenarios.')
+    parser.add_argument('--batch-rows', type=int, default=20, help='Agreements per draft_pdf_batch request.')
+    parser.add_argument('--latency-ms', type=float, default=200, help='Mean fake Gemini latency.')
+    parser.add_argument('--jitter-ms', type=float, default=50)
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of fake Gemini calls that raise.')
+    parser.add_argument('--output-chars', type=int, default=800, help='Size of fake Gemini text responses.')
+    parser.add_argument('--tts-latency-ms', type=float, default=100)
+    parser.add_argument('--cache', action='store_true', help='Reuse identical documents so caches can hit.')
+    parser.add_argument('--tracemalloc', action='store_true', help='Report peak Python heap per endpoint (slower).')
+    parser.add_argument('--timeout', type=float, default=120, help='Seconds to wait for a translation job.')
+    parser.add_argument('--json', dest='json_path', help='Write the report to this file.')
+    parser.add_argument('--max-p95-ms', type=float, help='Exit non-zero if any endpoint p95 exceeds this.')
+    parser.add_argument('--max-error-rate', type=float, help='Exit non-zero if any endpoint error rate exceeds this.')
+    args = parser.parse_args(argv)
+    args.languages = [lang.strip() for lang in args.languages.split(',') if lang.strip()]
+    names = list(SCENARIOS) if args.endpoints == 'all' else [name.strip() for name in args.endpoints.split(',')]
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"Unknown endpoints: {', '.join(unknown)}")
+    args.endpoints = names
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.environ.setdefault('GEMINI_API_KEY', 'benchmark')
+    os.environ.setdefault('SECRET_KEY', 'benchmark')
+    # Sessions and the TTS cache are written relative to the working directory; keep them out of the repo.
+    json_path = os.path.abspath(args.json_path) if args.json_path else None
+    os.chdir(tempfile.mkdtemp(prefix='demystilex-bench-'))
+
+    fake = FakeGemini(args.latency_ms / 1000, args.jitter_ms / 1000, args.error_rate, args.output_chars).install()
+    install_fake_tts(args.tts_latency_ms / 1000)
+    import logging
+    import app as app_module
+    logging.getLogger().setLevel(logging.CRITICAL)
+    app = app_module.app
+
+    results = {}
+    for name in args.endpoints:
+        results[name] = run_phase(app, BenchContext(args), SCENARIOS[name])
+        print(f"{name}: p95 {results[name]['p95_ms']} ms, {results[name]['throughput_rps']} req/s, {results[name]['errors']} errors", file=sys.stderr)
+
+    print_table(results)
+    report = {
+        'config': {key: value for key, value in vars(args).items() if key != 'json_path'},
+        'fake_gemini': fake.stats(),
+        'endpoints': results,
+    }
+    if json_path:
+        with open(json_path, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    failed = [name for name, result in results.items()
+              if (args.max_p95_ms is not None and (result['p95_ms'] or 0) > args.max_p95_ms)
+              or (args.max_error_rate is not None and result['errors'] / max(1, result['requests']) > args.max_error_rate)]
+    if failed:
+        print(f"Thresholds exceeded: {', '.join(failed)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
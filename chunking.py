@@ -0,0 +1,77 @@
+# chunking.py
+import re
+
+# Rough heuristic for Gemini tokenization of English/Latin-script text.
+CHARS_PER_TOKEN = 4
+
+# Strongest boundary first: page breaks, numbered clauses / headings, blank lines,
+# single newlines, sentence ends, and finally whitespace.
+_CLAUSE_START = re.compile(
+    r'\n(?=\s*(?:\d+(?:\.\d+)*[.)]\s|\(?[a-z]\)\s|(?:clause|article|section|schedule)\s+\w+|[A-Z][A-Z \-]{3,}:))',
+    re.IGNORECASE
+)
+_BOUNDARIES = [
+    re.compile(r'\f'),
+    _CLAUSE_START,
+    re.compile(r'\n\s*\n'),
+    re.compile(r'\n'),
+    re.compile(r'(?<=[.;:!?])\s+'),
+    re.compile(r'\s+'),
+]
+
+
+def estimate_tokens(text):
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _split_on(text, pattern):
+    pieces, start = [], 0
+    for match in pattern.finditer(text):
+        end = match.end() if match.end() > match.start() else match.start()
+        if end > start:
+            pieces.append(text[start:end])
+            start = end
+    if start < len(text):
+        pieces.append(text[start:])
+    return pieces
+
+
+def _split_piece(text, max_chars, level):
+    if len(text) <= max_chars:
+        return [text]
+    if level >= len(_BOUNDARIES):
+        return [text[i:i + max_chars] for i in range(0, len(text), max_chars)]
+    pieces = _split_on(text, _BOUNDARIES[level])
+    if len(pieces) <= 1:
+        return _split_piece(text, max_chars, level + 1)
+    result = []
+    for piece in pieces:
+        result.extend(_split_piece(piece, max_chars, level + 1))
+    return result
+
+
+def split_into_chunks(text, max_tokens=1500):
+    """Split text into ordered chunks of at most ~max_tokens, preferring clause boundaries."""
+    if not text:
+        return []
+    max_chars = max(1, max_tokens * CHARS_PER_TOKEN)
+    chunks, current = [], ''
+    for piece in _split_piece(text, max_chars, 0):
+        if current and len(current) + len(piece) > max_chars:
+            chunks.append(current)
+            current = ''
+        current += piece
+    if current.strip():
+        chunks.append(current)
+    elif chunks:
+        chunks[-1] += current
+    return chunks
+
+
+def join_translated_chunks(source_chunks, translated_chunks):
+    # Keep the original paragraph/page spacing between reassembled chunks.
+    parts = []
+    for source, translated in zip(source_chunks, translated_chunks):
+        separator = re.search(r'\s*$', source).group(0) or ' '
+        parts.append(translated.strip() + separator)
+    return ''.join(parts).strip()
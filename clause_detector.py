@@ -0,0 +1,184 @@
+# clause_detector.py
+import re
+import bisect
+from collections import deque
+
+# Standard principles checked by /api/compare_clauses, with the phrases that signal each one.
+STANDARD_CLAUSES = {
+    'parties': {
+        'label': 'Clearly defined parties (landlord and tenant)',
+        'keywords': ['landlord', 'lessor', 'owner', 'licensor', 'tenant', 'lessee', 'licensee',
+                     'hereinafter referred to as', 'between'],
+    },
+    'property': {
+        'label': 'Description of the property',
+        'keywords': ['property', 'premises', 'flat no', 'house no', 'apartment', 'schedule property',
+                     'situated at', 'located at', 'square feet', 'sq. ft', 'sq ft'],
+    },
+    'term': {
+        'label': 'Term / duration of the tenancy',
+        'keywords': ['term of', 'period of', 'months', 'duration', 'commencing from', 'commence on',
+                     'lease period', 'tenancy period', 'valid for', 'expire'],
+    },
+    'rent': {
+        'label': 'Rent amount and payment terms',
+        'keywords': ['rent', 'monthly rental', 'license fee', 'licence fee', 'per month', 'payable on or before'],
+    },
+    'deposit': {
+        'label': 'Security deposit',
+        'keywords': ['security deposit', 'deposit', 'advance amount', 'refundable', 'interest free'],
+    },
+    'notice_period': {
+        'label': 'Reasonable notice period for termination (1-2 months)',
+        'keywords': ['notice period', "months' notice", 'months notice', 'month notice', 'written notice',
+                     'notice in writing', 'prior notice', 'terminate'],
+    },
+    'maintenance': {
+        'label': 'Maintenance and repair responsibilities',
+        'keywords': ['maintenance', 'repairs', 'repair', 'upkeep', 'wear and tear', 'society charges',
+                     'electricity', 'water charges'],
+    },
+}
+
+# Phrases that usually mark terms unfavourable to the tenant.
+RISK_TERMS = {
+    'non-refundable': 'Deposit or payment described as non-refundable',
+    'forfeit': 'Forfeiture of deposit or payments',
+    'lock-in': 'Lock-in period restricting early exit',
+    'lock in period': 'Lock-in period restricting early exit',
+    'penalty': 'Penalty clause',
+    'without notice': 'Action allowed without notice',
+    'at any time': 'Open-ended right exercisable at any time',
+    'sole discretion': "Decision left to the landlord's sole discretion",
+    'increase the rent': 'Unilateral rent increase',
+    'escalation': 'Rent escalation',
+    'all repairs': 'Tenant responsible for all repairs',
+    'indemnify': 'Broad indemnity obligation',
+    'no refund': 'No refund of amounts paid',
+}
+
+# Notice periods above two months are flagged even though the clause exists.
+_LONG_NOTICE = re.compile(r'\b([3-9]|1[0-2]|three|four|five|six)\s*(?:\(\w+\)\s*)?months?\W{0,3}\s*(?:prior\s+|written\s+)?notice', re.IGNORECASE)
+# Sentence / line boundaries, skipping the abbreviations common in Indian agreements ("Rs.", "Mr.", "No.").
+SECTION_BREAK = re.compile(
+    r'(?<!\bRs\.)(?<!\bMr\.)(?<!\bMs\.)(?<!\bDr\.)(?<!\bNo\.)(?<!\bMrs\.)(?<!\bSmt\.)(?<!\bSri\.)'
+    r'(?<=[.;!?])\s+(?=[A-Z0-9("])|\n+'
+)
+_WORD = re.compile(r'\w')
+
+
+class AhoCorasick:
+    """Multi-pattern matcher: finds every occurrence of every keyword in one pass."""
+
+    def __init__(self, patterns):
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        for pattern, value in patterns:
+            self._add(pattern, value)
+        self._build()
+
+    def _add(self, pattern, value):
+        state = 0
+        for char in pattern:
+            if char not in self._goto[state]:
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+                self._goto[state][char] = len(self._goto) - 1
+            state = self._goto[state][char]
+        self._output[state].append((len(pattern), value))
+
+    def _build(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def finditer(self, text):
+        """Yield (start, end, value) for every match."""
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for length, value in self._output[state]:
+                yield index - length + 1, index + 1, value
+
+
+def _is_whole_word(text, start, end):
+    before = text[start - 1] if start > 0 else ' '
+    after = text[end] if end < len(text) else ' '
+    return not _WORD.match(before) and not _WORD.match(after)
+
+
+class ClauseDetector:
+    def __init__(self, clauses=STANDARD_CLAUSES, risk_terms=RISK_TERMS):
+        self.clauses = clauses
+        self.risk_terms = risk_terms
+        patterns = [(keyword.lower(), ('clause', key)) for key, clause in clauses.items() for keyword in clause['keywords']]
+        patterns += [(term.lower(), ('risk', term)) for term in risk_terms]
+        self._matcher = AhoCorasick(patterns)
+
+    def analyze(self, text):
+        sections, starts = [], []
+        position = 0
+        for piece in SECTION_BREAK.split(text):
+            start = text.find(piece, position)
+            position = start + len(piece)
+            if piece.strip():
+                sections.append(piece.strip())
+                starts.append(start)
+
+        lowered = text.lower()
+        present = {}
+        risky = {}
+        for start, end, (kind, key) in self._matcher.finditer(lowered):
+            if not _is_whole_word(lowered, start, end):
+                continue
+            section = max(0, bisect.bisect_right(starts, start) - 1)
+            if kind == 'clause':
+                present.setdefault(key, set()).add(section)
+            else:
+                risky.setdefault(section, set()).add(self.risk_terms[key])
+        for match in _LONG_NOTICE.finditer(text):
+            section = max(0, bisect.bisect_right(starts, match.start()) - 1)
+            risky.setdefault(section, set()).add('Notice period longer than two months')
+
+        return {
+            'sections': sections,
+            'present': {key: sorted(found) for key, found in present.items()},
+            'missing': [key for key in self.clauses if key not in present],
+            'risky': [{'section': section, 'reasons': sorted(reasons)} for section, reasons in sorted(risky.items())],
+        }
+
+    def flagged_sections(self, analysis, max_sections=40):
+        # Every risky section plus the first mention of each present clause, in document order.
+        flagged = {item['section'] for item in analysis['risky']}
+        flagged.update(found[0] for found in analysis['present'].values())
+        return [analysis['sections'][index] for index in sorted(flagged)[:max_sections]]
+
+    def fast_report(self, analysis):
+        missing = [self.clauses[key]['label'] for key in analysis['missing']]
+        risky = []
+        for item in analysis['risky']:
+            entry = f"{'; '.join(item['reasons'])}: \"{analysis['sections'][item['section']][:200]}\""
+            if entry not in risky:
+                risky.append(entry)
+        found = len(self.clauses) - len(missing)
+        summary = (
+            f"Automated keyword check: {found} of {len(self.clauses)} standard clauses appear to be present"
+            + (f", {len(missing)} appear{'s' if len(missing) == 1 else ''} to be missing" if missing else "")
+            + (f", and {len(risky)} passage(s) contain terms that are often unfavourable to tenants." if risky else ".")
+            + " This is a quick offline screen, not a legal review."
+        )
+        return {'missing_clauses': missing, 'risky_clauses': risky, 'summary': summary}
+
+
+detector = ClauseDetector()
@@ -0,0 +1,121 @@
+# concurrency.py
+import time
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, bursting up to `capacity`."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens=1, timeout=None):
+        if self.rate <= 0:
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return True
+                wait = (tokens - self._tokens) / self.rate
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+
+class CallLimiter:
+    """Caps in-flight upstream calls and paces them through a token bucket."""
+
+    def __init__(self, max_in_flight=8, rate=5.0, burst=None, on_wait=None):
+        self.max_in_flight = max_in_flight
+        # Called with the seconds each caller spent waiting for a slot and a token.
+        self.on_wait = on_wait
+        self._semaphore = threading.BoundedSemaphore(max_in_flight)
+        self._bucket = TokenBucket(rate, burst)
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    @property
+    def in_flight(self):
+        return self._in_flight
+
+    def __enter__(self):
+        start = time.monotonic()
+        self._semaphore.acquire()
+        try:
+            self._bucket.acquire()
+        except BaseException:
+            self._semaphore.release()
+            raise
+        with self._lock:
+            self._in_flight += 1
+        if self.on_wait is not None:
+            self.on_wait(time.monotonic() - start)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        with self._lock:
+            self._in_flight -= 1
+        self._semaphore.release()
+        return False
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor(max_workers=16):
+    # One pool per process; the first caller decides its size.
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='llm')
+        return _executor
+
+
+class ProcessPool:
+    """A 'spawn' process pool that is rebuilt when a worker dies, instead of refusing every later submit."""
+
+    def __init__(self, max_workers, name='process'):
+        self.max_workers = max_workers
+        self.name = name
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _current(self):
+        with self._lock:
+            if self._executor is None:
+                # 'spawn' keeps the workers independent of the request threads in the parent.
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context('spawn'))
+            return self._executor
+
+    def submit(self, fn, *args, **kwargs):
+        executor = self._current()
+        try:
+            return executor.submit(fn, *args, **kwargs)
+        except BrokenProcessPool:
+            with self._lock:
+                # Only the first caller to notice replaces the pool; tasks already queued on it have failed.
+                if self._executor is executor:
+                    logging.warning(f"The {self.name} pool broke; starting new worker processes")
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    self._executor = None
+            return self._current().submit(fn, *args, **kwargs)
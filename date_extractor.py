@@ -0,0 +1,179 @@
+# date_extractor.py
+import re
+import calendar
+from datetime import date, timedelta
+
+from clause_detector import SECTION_BREAK
+
+_MONTHS = {name.lower(): index for index, name in enumerate(calendar.month_name) if name}
+_MONTHS.update({name.lower(): index for index, name in enumerate(calendar.month_abbr) if name})
+_MONTHS['sept'] = 9
+_MONTH_NAMES = '|'.join(sorted(_MONTHS, key=len, reverse=True))
+
+_UNITS = {
+    'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6, 'seven': 7, 'eight': 8, 'nine': 9,
+    'ten': 10, 'eleven': 11, 'twelve': 12, 'thirteen': 13, 'fourteen': 14, 'fifteen': 15, 'sixteen': 16,
+    'seventeen': 17, 'eighteen': 18, 'nineteen': 19,
+}
+_TENS = {'twenty': 20, 'thirty': 30, 'forty': 40, 'fifty': 50, 'sixty': 60, 'seventy': 70, 'eighty': 80, 'ninety': 90}
+_NUMBER_WORD = r'(?:(?:twenty|thirty|forty|fifty|sixty|seventy|eighty|ninety)(?:[\s-](?:one|two|three|four|five|six|seven|eight|nine))?|' + '|'.join(sorted(_UNITS, key=len, reverse=True)) + ')'
+
+_ORDINAL = r'(\d{1,2})(?:st|nd|rd|th)?'
+_YEAR = r'(\d{4})'
+
+# Day-first numeric dates, as used in India: 05/01/2024, 5-1-24, 05.01.2024
+_NUMERIC = re.compile(r'\b(\d{1,2})[/.\-](\d{1,2})[/.\-](\d{4}|\d{2})\b')
+_ISO = re.compile(r'\b(\d{4})-(\d{2})-(\d{2})\b')
+# "1st day of January, 2024", "5th January 2024", "5 Jan, 2024"
+_DAY_MONTH_YEAR = re.compile(
+    rf'\b{_ORDINAL}\s+(?:day\s+of\s+(?:the\s+month\s+of\s+)?)?({_MONTH_NAMES})\.?,?\s*(?:in\s+the\s+year\s+)?{_YEAR}\b',
+    re.IGNORECASE
+)
+# "January 5, 2024", "Jan 5th 2024"
+_MONTH_DAY_YEAR = re.compile(rf'\b({_MONTH_NAMES})\.?\s+{_ORDINAL},?\s+{_YEAR}\b', re.IGNORECASE)
+# "eleven months from", "11 (eleven) months from", "30 days of", "2 years commencing"
+_RELATIVE = re.compile(
+    rf'\b(\d{{1,3}}|{_NUMBER_WORD})\s*(?:\(\s*(?:\d{{1,3}}|{_NUMBER_WORD})\s*\)\s*)?(day|week|month|year)s?\b'
+    r'(?=[^.;\n]{0,40}?\b(from|after|of|commencing|starting|following|before|prior|notice)\b)',
+    re.IGNORECASE
+)
+
+# Words after a period that tie it to an earlier date; "before"/"notice" periods are durations only.
+_ANCHORED = {'from', 'after', 'of', 'commencing', 'starting', 'following'}
+# Without a date in the same sentence, a period is only resolved against the agreement date when it refers to it.
+_AGREEMENT_ANCHOR = re.compile(r'\b(?:this\s+agreement|commencement|execution|date\s+hereof)\b', re.IGNORECASE)
+
+_SIGNIFICANCE_HINTS = [
+    (('made on', 'executed on', 'dated', 'entered into', 'is made'), 'Agreement Date'),
+    (('commenc', 'start', 'effective', 'begin'), 'Agreement Start Date'),
+    (('expir', 'end on', 'ending', 'till', 'until'), 'Lease Expiry Date'),
+    (('notice',), 'Notice Period'),
+    (('payable', 'due', 'rent shall be paid'), 'Rent Payment Date'),
+    (('deposit', 'refund'), 'Deposit Refund Date'),
+    (('renew',), 'Renewal Date'),
+]
+
+
+def parse_number(token):
+    token = token.lower().replace('-', ' ').strip()
+    if token.isdigit():
+        return int(token)
+    parts = token.split()
+    if parts[0] in _TENS:
+        return _TENS[parts[0]] + (_UNITS[parts[1]] if len(parts) > 1 else 0)
+    return _UNITS.get(parts[0])
+
+
+def add_period(start, amount, unit):
+    unit = unit.lower()
+    if unit == 'day':
+        return start + timedelta(days=amount)
+    if unit == 'week':
+        return start + timedelta(weeks=amount)
+    months = amount * (12 if unit == 'year' else 1)
+    month_index = start.month - 1 + months
+    year, month = start.year + month_index // 12, month_index % 12 + 1
+    return date(year, month, min(start.day, calendar.monthrange(year, month)[1]))
+
+
+def _safe_date(year, month, day):
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+
+def _sentences(text):
+    start = 0
+    for match in SECTION_BREAK.finditer(text):
+        yield start, match.start()
+        start = match.end()
+    yield start, len(text)
+
+
+def find_date_candidates(text):
+    """Return date expressions in document order, each with its surrounding sentence."""
+    spans = []
+    for match in _NUMERIC.finditer(text):
+        day, month, year = int(match.group(1)), int(match.group(2)), match.group(3)
+        year = int(year) + (2000 if len(year) == 2 else 0)
+        spans.append((match.start(), match.end(), 'absolute', _safe_date(year, month, day)))
+    for match in _ISO.finditer(text):
+        spans.append((match.start(), match.end(), 'absolute', _safe_date(int(match.group(1)), int(match.group(2)), int(match.group(3)))))
+    for match in _DAY_MONTH_YEAR.finditer(text):
+        spans.append((match.start(), match.end(), 'absolute', _safe_date(int(match.group(3)), _MONTHS[match.group(2).lower()], int(match.group(1)))))
+    for match in _MONTH_DAY_YEAR.finditer(text):
+        spans.append((match.start(), match.end(), 'absolute', _safe_date(int(match.group(3)), _MONTHS[match.group(1).lower()], int(match.group(2)))))
+    for match in _RELATIVE.finditer(text):
+        amount = parse_number(match.group(1))
+        if amount:
+            anchored = match.group(3).lower() in _ANCHORED and 'notice' not in match.group(0).lower()
+            spans.append((match.start(), match.end(), 'relative', (amount, match.group(2).lower(), anchored)))
+
+    # Drop spans nested inside a longer one (e.g. "2024-01-05" also matching the numeric pattern).
+    spans.sort(key=lambda span: (span[0], -(span[1] - span[0])))
+    candidates = []
+    last_end = -1
+    sentences = list(_sentences(text))
+    for start, end, kind, value in spans:
+        if start < last_end:
+            continue
+        last_end = end
+        sentence_start, sentence_end = next(((s, e) for s, e in sentences if s <= start < e), (start, end))
+        candidate = {
+            'text': text[start:end],
+            'kind': kind,
+            'context': ' '.join(text[sentence_start:sentence_end].split()),
+            'start': start,
+        }
+        if kind == 'absolute':
+            candidate['iso'] = value.isoformat() if value else None
+        else:
+            candidate['amount'], candidate['unit'], candidate['anchored'] = value
+        candidates.append(candidate)
+    return candidates
+
+
+def guess_significance(context):
+    lowered = context.lower()
+    for hints, label in _SIGNIFICANCE_HINTS:
+        if any(hint in lowered for hint in hints):
+            return label
+    return 'Date Mentioned'
+
+
+def resolve_offline(candidates):
+    """Turn candidates into [{date, significance, ...}] without a model.
+
+    Relative periods are anchored on an absolute date in the same sentence, or on the first
+    date in the document (usually the agreement date) when they refer to the agreement.
+    """
+    document_date = next((c['iso'] for c in candidates if c['kind'] == 'absolute' and c['iso']), None)
+    results = []
+    for candidate in candidates:
+        item = {'source_text': candidate['text'], 'context': candidate['context']}
+        if candidate['kind'] == 'absolute':
+            item['date'] = candidate['iso'] or candidate['text']
+        else:
+            anchor = next((c['iso'] for c in candidates
+                           if c['kind'] == 'absolute' and c['iso'] and c['context'] == candidate['context']), None)
+            if anchor is None and _AGREEMENT_ANCHOR.search(candidate['context']):
+                anchor = document_date
+            period = f"{candidate['amount']} {candidate['unit']}{'s' if candidate['amount'] != 1 else ''}"
+            item['period'] = period
+            if candidate['anchored'] and anchor:
+                try:
+                    item['date'] = add_period(date.fromisoformat(anchor), candidate['amount'], candidate['unit']).isoformat()
+                except (OverflowError, ValueError):
+                    # The period runs past year 9999, so the text is malformed rather than a real date.
+                    continue
+                item['anchor'] = anchor
+                item['significance'] = f"End of {period} from {anchor}"
+            else:
+                item['date'] = period
+                item['significance'] = 'Notice Period' if 'notice' in candidate['context'].lower() else 'Period'
+            results.append(item)
+            continue
+        item['significance'] = guess_significance(candidate['context'])
+        results.append(item)
+    return results
@@ -0,0 +1,101 @@
+# document_store.py
+import hashlib
+import threading
+from collections import OrderedDict
+
+import extraction
+import normalization
+
+
+def document_id_for(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class DocumentStore:
+    """LRU store of extracted documents keyed by the SHA-256 of the uploaded bytes."""
+
+    def __init__(self, max_entries=256, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._documents = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # Per-document locks so concurrent uploads of the same file extract it only once.
+        self._pending = {}
+
+    def get(self, document_id):
+        with self._lock:
+            document = self._documents.get(document_id)
+            if document is not None:
+                self._documents.move_to_end(document_id)
+            return document
+
+    def add(self, data, filename):
+        document_id = document_id_for(data)
+        document = self.get(document_id)
+        if document is not None:
+            return document
+
+        with self._lock:
+            pending = self._pending.setdefault(document_id, threading.Lock())
+        try:
+            with pending:
+                document = self.get(document_id)
+                if document is None:
+                    document = self._extract(document_id, data, filename)
+                    self._put(document)
+        finally:
+            # Released even when extraction fails, so the next upload of these bytes starts afresh.
+            with self._lock:
+                if self._pending.get(document_id) is pending:
+                    del self._pending[document_id]
+        return document
+
+    def stats(self):
+        with self._lock:
+            return {'documents': len(self._documents), 'bytes': self._bytes}
+
+    def _extract(self, document_id, data, filename):
+        pages = extraction.extract_pages(data, filename)
+        if filename.lower().endswith('.txt'):
+            text = '\f'.join(pages)
+            page_offsets = []
+            offset = 0
+            for page in pages:
+                page_offsets.append(offset)
+                offset += len(page) + 1
+        else:
+            page_offsets = []
+            offset = 0
+            for page in pages:
+                page_offsets.append(offset)
+                if page:
+                    offset += len(page) + 1
+            text = extraction.join_pages(pages)
+        # 'text' keeps the extracted layout (page_offsets index into it); prompts use 'prompt_text'.
+        prompt_text, stats = normalization.normalize_document(pages, filename)
+        if prompt_text == text:
+            prompt_text = text
+        return {
+            'document_id': document_id,
+            'filename': filename,
+            'text': text,
+            'prompt_text': prompt_text,
+            'normalization': stats,
+            'page_offsets': page_offsets,
+            'page_count': len(pages),
+            'size': len(text) + (len(prompt_text) if prompt_text is not text else 0),
+        }
+
+    def _put(self, document):
+        with self._lock:
+            previous = self._documents.pop(document['document_id'], None)
+            if previous is not None:
+                self._bytes -= previous['size']
+            self._documents[document['document_id']] = document
+            self._bytes += document['size']
+            while self._documents and (len(self._documents) > self.max_entries or self._bytes > self.max_bytes):
+                if len(self._documents) == 1:
+                    break
+                _, evicted = self._documents.popitem(last=False)
+                self._bytes -= evicted['size']
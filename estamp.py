@@ -0,0 +1,106 @@
+# estamp.py
+import os
+import re
+import io
+import zlib
+import bisect
+import zipfile
+
+import extraction
+
+UIN_PATTERN = re.compile(r'IN-[A-Z]{2}\d{12}[A-Z]')
+VERIFICATION_URL = 'https://www.shcilestamp.com/eStamp_en/verifyestamp.jsp'
+
+BATCH_MAX_FILES = int(os.getenv('ESTAMP_BATCH_MAX_FILES', '200'))
+# Guards against zip bombs: total uncompressed size allowed across an archive.
+BATCH_MAX_ARCHIVE_BYTES = int(os.getenv('ESTAMP_BATCH_MAX_ARCHIVE_MB', '500')) * 1024 * 1024
+# Files submitted to the pool but not yet collected; later archive members are only decompressed as these finish.
+BATCH_IN_FLIGHT = int(os.getenv('ESTAMP_BATCH_IN_FLIGHT', str(2 * extraction.PDF_EXTRACTION_WORKERS)))
+
+
+class BatchError(ValueError):
+    pass
+
+
+def find_first_uin(pages):
+    """Scan pages in order and stop at the first UIN. Returns (uin, page_number) or (None, None)."""
+    try:
+        for page_number, page_text in enumerate(pages, start=1):
+            match = UIN_PATTERN.search(page_text)
+            if match:
+                return match.group(0), page_number
+        return None, None
+    finally:
+        # Closing an extraction generator cancels the pages it has not reached yet.
+        close = getattr(pages, 'close', None)
+        if close:
+            close()
+
+
+def find_uin_in_text(text, page_offsets=None):
+    # For documents that were already extracted in full (e.g. from the document store).
+    match = UIN_PATTERN.search(text)
+    if not match:
+        return None, None
+    page_number = bisect.bisect_right(page_offsets, match.start()) if page_offsets else 1
+    return match.group(0), page_number
+
+
+def find_all_uins(data, filename):
+    # Runs inside an extraction pool worker, so extract this file serially.
+    found = []
+    seen = set()
+    for page_number, page_text in enumerate(extraction.iter_pages(data, filename, parallel=False), start=1):
+        for match in UIN_PATTERN.finditer(page_text):
+            if match.group(0) not in seen:
+                seen.add(match.group(0))
+                found.append({'uin': match.group(0), 'page': page_number})
+    return found
+
+
+def _read_member(archive, info):
+    # Bounded read: the sizes in the zip header can lie, and the extraction size limit applies anyway.
+    with archive.open(info) as member:
+        data = member.read(extraction.MAX_UPLOAD_BYTES + 1)
+    if len(data) > extraction.MAX_UPLOAD_BYTES:
+        raise extraction.ExtractionError("File exceeds the upload size limit.")
+    return data
+
+
+def iter_batch_files(files):
+    """Yield (filename, bytes, error) for each uploaded file, expanding .zip archives.
+
+    A member that cannot be read (bad CRC, truncated or encrypted data) is yielded with bytes None and an error
+    message, so the rest of the batch is still scanned.
+    """
+    count = 0
+    for file in files:
+        if not file.filename:
+            continue
+        if file.filename.lower().endswith('.zip'):
+            try:
+                archive = zipfile.ZipFile(io.BytesIO(file.read()))
+            except zipfile.BadZipFile:
+                raise BatchError(f"{file.filename} is not a valid zip archive.")
+            with archive:
+                members = [info for info in archive.infolist()
+                           if not info.is_dir() and info.filename.lower().endswith(extraction.SUPPORTED_EXTENSIONS)]
+                if sum(info.file_size for info in members) > BATCH_MAX_ARCHIVE_BYTES:
+                    raise BatchError(f"{file.filename} is too large once uncompressed.")
+                for info in members:
+                    count += 1
+                    if count > BATCH_MAX_FILES:
+                        raise BatchError(f"A batch can contain at most {BATCH_MAX_FILES} files.")
+                    filename = f"{file.filename}/{info.filename}"
+                    try:
+                        data, error = _read_member(archive, info), None
+                    except extraction.ExtractionError as e:
+                        data, error = None, str(e)
+                    except (zipfile.BadZipFile, zlib.error, RuntimeError, NotImplementedError, EOFError, OSError):
+                        data, error = None, "The file could not be read from the archive."
+                    yield filename, data, error
+        else:
+            count += 1
+            if count > BATCH_MAX_FILES:
+                raise BatchError(f"A batch can contain at most {BATCH_MAX_FILES} files.")
+            yield file.filename, file.read(), None
@@ -0,0 +1,110 @@
+# extraction.py
+import os
+import io
+import logging
+import threading
+
+from concurrency import ProcessPool
+import metrics
+import startup
+
+PDF_EXTRACTION_WORKERS = int(os.getenv('PDF_EXTRACTION_WORKERS', str(min(4, os.cpu_count() or 1))))
+# Below this many pages the process pool costs more than it saves.
+PARALLEL_MIN_PAGES = int(os.getenv('PDF_PARALLEL_MIN_PAGES', '8'))
+MAX_UPLOAD_BYTES = int(os.getenv('MAX_UPLOAD_MB', '20')) * 1024 * 1024
+MAX_PDF_PAGES = int(os.getenv('MAX_PDF_PAGES', '200'))
+# Under gevent workers, pdfplumber would block every request in the process, so all PDF
+# parsing goes to the pool, not just large documents.
+OFFLOAD_ALL = os.getenv('PDF_EXTRACTION_OFFLOAD', '0') == '1'
+
+SUPPORTED_EXTENSIONS = ('.txt', '.pdf')
+
+
+class ExtractionError(ValueError):
+    pass
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPool(PDF_EXTRACTION_WORKERS, name='PDF extraction')
+        return _pool
+
+
+def _open_pdf(data):
+    return startup.load('pdfplumber').open(io.BytesIO(data))
+
+
+def _extract_page_range(data, start, stop):
+    with _open_pdf(data) as pdf:
+        return [pdf.pages[i].extract_text() or '' for i in range(start, stop)]
+
+
+def count_pdf_pages(data):
+    with _open_pdf(data) as pdf:
+        return len(pdf.pages)
+
+
+def _check_limits(data, filename, max_bytes):
+    if not filename or not filename.lower().endswith(SUPPORTED_EXTENSIONS):
+        raise ExtractionError("Unsupported file type.")
+    max_bytes = MAX_UPLOAD_BYTES if max_bytes is None else max_bytes
+    if max_bytes and len(data) > max_bytes:
+        raise ExtractionError("File exceeds the upload size limit.")
+
+
+def _page_batches(page_count):
+    batch_size = max(2, -(-page_count // (PDF_EXTRACTION_WORKERS * 2)))
+    return [(start, min(start + batch_size, page_count)) for start in range(0, page_count, batch_size)]
+
+
+def iter_pages(data, filename, max_pages=None, max_bytes=None, parallel=True):
+    """Yield page texts in order as soon as they are extracted.
+
+    Closing the generator early cancels any page batches that have not started.
+    Pass parallel=False when already running inside a pool worker.
+    """
+    _check_limits(data, filename, max_bytes)
+    if filename.lower().endswith('.txt'):
+        pages = data.decode('utf-8').split('\f')
+        yield from pages[:max_pages] if max_pages else pages
+        return
+
+    offload = parallel and OFFLOAD_ALL
+    max_pages = MAX_PDF_PAGES if max_pages is None else max_pages
+    page_count = get_pool().submit(count_pdf_pages, data).result() if offload else count_pdf_pages(data)
+    if max_pages and page_count > max_pages:
+        logging.info(f"Extracting the first {max_pages} of {page_count} pages from {filename}")
+        page_count = max_pages
+
+    if offload and (page_count < PARALLEL_MIN_PAGES or PDF_EXTRACTION_WORKERS <= 1):
+        yield from get_pool().submit(_extract_page_range, data, 0, page_count).result()
+        return
+    if not parallel or page_count < PARALLEL_MIN_PAGES or PDF_EXTRACTION_WORKERS <= 1:
+        with _open_pdf(data) as pdf:
+            for i in range(page_count):
+                yield pdf.pages[i].extract_text() or ''
+        return
+
+    pool = get_pool()
+    futures = [pool.submit(_extract_page_range, data, start, stop) for start, stop in _page_batches(page_count)]
+    try:
+        for future in futures:
+            yield from future.result()
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+@metrics.timed('extraction')
+def extract_pages(data, filename, max_pages=None, max_bytes=None):
+    return list(iter_pages(data, filename, max_pages=max_pages, max_bytes=max_bytes))
+
+
+def join_pages(pages):
+    return ''.join(page + "\n" for page in pages if page)
@@ -0,0 +1,253 @@
+# gemini_client.py
+import os
+import time
+import random
+import logging
+import threading
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from concurrency import CallLimiter
+import metrics
+import startup
+
+HEDGES = metrics.counter('demystilex_llm_hedges_total', 'Hedged Gemini requests sent after the primary was slow.', ('model',))
+CIRCUIT_REJECTIONS = metrics.counter('demystilex_llm_circuit_rejections_total', 'Gemini calls refused while the circuit was open.', ('model',))
+
+
+class CircuitOpenError(RuntimeError):
+    def __init__(self, retry_after):
+        super().__init__("The AI service is temporarily unavailable. Please try again shortly.")
+        self.retry_after = retry_after
+
+
+def is_transient(exc):
+    """Errors worth retrying: rate limits, upstream 5xx, timeouts and dropped connections."""
+    try:
+        from google.api_core import exceptions as api_exceptions
+        retryable = (api_exceptions.TooManyRequests, api_exceptions.ResourceExhausted, api_exceptions.ServiceUnavailable,
+                     api_exceptions.InternalServerError, api_exceptions.BadGateway, api_exceptions.GatewayTimeout,
+                     api_exceptions.DeadlineExceeded)
+    except ImportError:
+        retryable = ()
+    try:
+        # The REST transport raises these; they do not subclass the builtin ConnectionError/TimeoutError.
+        from requests import exceptions as requests_exceptions
+        retryable += (requests_exceptions.ConnectionError, requests_exceptions.Timeout)
+    except ImportError:
+        pass
+    return isinstance(exc, retryable + (ConnectionError, TimeoutError))
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive transient failures; one trial call is let through after `reset_timeout`."""
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        with self._lock:
+            if self.state == 'open':
+                remaining = self._opened_at + self.reset_timeout - time.monotonic()
+                if remaining > 0:
+                    raise CircuitOpenError(remaining)
+                self.state = 'half_open'
+                self._trial_in_flight = False
+            if self.state == 'half_open':
+                if self._trial_in_flight:
+                    raise CircuitOpenError(self.reset_timeout)
+                self._trial_in_flight = True
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == 'half_open' or self._failures >= self.failure_threshold:
+                if self.state != 'open':
+                    logging.warning(f"Gemini circuit opened after {self._failures} consecutive failures")
+                self.state = 'open'
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+
+class GeminiClient:
+    """One shared model per process: cached, rate-limited, retried, optionally hedged and guarded by a circuit breaker."""
+
+    def __init__(self, model_name='gemini-1.5-flash', cache=None, limiter=None, timeout=60.0, max_retries=3,
+                 backoff_base=0.5, backoff_max=8.0, hedge_after=None, breaker=None, api_key=None, transport=None):
+        # Same normalisation as genai.GenerativeModel, so cache keys do not depend on when the SDK loads.
+        self.model_name = model_name if '/' in model_name else f'models/{model_name}'
+        self.cache = cache
+        self.limiter = limiter
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge_after = hedge_after
+        self.breaker = breaker or CircuitBreaker()
+        self._api_key = api_key
+        self._transport = transport
+        self._model = None
+        self._model_lock = threading.Lock()
+        # Every hedged call can hold two threads, so the pool must not cap calls below the limiter's in-flight cap.
+        # Threads are started on demand (and are greenlets under gevent), so a large bound costs nothing when idle.
+        hedge_workers = 2 * limiter.max_in_flight if limiter is not None else 16
+        self._hedge_pool = ThreadPoolExecutor(max_workers=hedge_workers, thread_name_prefix='gemini-hedge') if hedge_after else None
+
+    @classmethod
+    def from_env(cls, model_name='gemini-1.5-flash', cache=None, on_wait=None):
+        """A client configured from GEMINI_API_KEY, GEMINI_TRANSPORT and the GEMINI_* limits; the limits apply per process."""
+        hedge_after = os.getenv('GEMINI_HEDGE_AFTER')
+        return cls(
+            model_name,
+            cache=cache,
+            limiter=CallLimiter(
+                max_in_flight=int(os.getenv('GEMINI_MAX_IN_FLIGHT', '8')),
+                rate=float(os.getenv('GEMINI_RATE_PER_SEC', '5')),
+                burst=float(os.getenv('GEMINI_RATE_BURST', '10')),
+                on_wait=on_wait
+            ),
+            api_key=os.getenv('GEMINI_API_KEY'),
+            # 'rest' uses plain HTTP, which cooperates with gevent workers; the default is gRPC.
+            transport=os.getenv('GEMINI_TRANSPORT') or None,
+            timeout=float(os.getenv('GEMINI_TIMEOUT', '60')),
+            max_retries=int(os.getenv('GEMINI_MAX_RETRIES', '3')),
+            backoff_base=float(os.getenv('GEMINI_BACKOFF_BASE', '0.5')),
+            backoff_max=float(os.getenv('GEMINI_BACKOFF_MAX', '8')),
+            # Seconds before a slow call is hedged with a duplicate request; unset disables hedging.
+            hedge_after=float(hedge_after) if hedge_after else None,
+            breaker=CircuitBreaker(
+                failure_threshold=int(os.getenv('GEMINI_BREAKER_FAILURES', '5')),
+                reset_timeout=float(os.getenv('GEMINI_BREAKER_RESET', '30'))
+            )
+        )
+
+    @property
+    def model(self):
+        # The SDK is imported and configured on the first call, not when the app module loads.
+        # The model's API client, and with it the HTTP/gRPC connections, is then reused across requests.
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    genai = startup.load('google.generativeai')
+                    if self._api_key:
+                        genai.configure(api_key=self._api_key, transport=self._transport)
+                    self._model = genai.GenerativeModel(self.model_name)
+        return self._model
+
+    def generate(self, prompt):
+        key = self.cache.make_key(self.model_name, prompt) if self.cache else None
+        if key is not None:
+            cached = self.cache.get(key)
+            metrics.LLM_CACHE_LOOKUPS.inc(result='hit' if cached is not None else 'miss')
+            if cached is not None:
+                return cached
+        with metrics.llm_call(self.model_name, 'generate', prompt) as call:
+            attempt = 0
+            while True:
+                self._before_call()
+                try:
+                    text = self._call_hedged(prompt) if self._hedge_pool else self._call(prompt)
+                except Exception as e:
+                    self._after_failure(e, attempt)
+                    call.retries += 1
+                    attempt += 1
+                    continue
+                self.breaker.record_success()
+                break
+            call.response_chars = len(text)
+        if key is not None:
+            self.cache.set(key, text)
+        return text
+
+    def stream(self, prompt):
+        """Yield response text as it arrives. Retries only happen before the first chunk has been yielded."""
+        key = self.cache.make_key(self.model_name, prompt) if self.cache else None
+        if key is not None:
+            cached = self.cache.get(key)
+            metrics.LLM_CACHE_LOOKUPS.inc(result='hit' if cached is not None else 'miss')
+            if cached is not None:
+                yield cached
+                return
+        parts = []
+        with metrics.llm_call(self.model_name, 'stream', prompt) as call:
+            attempt = 0
+            while True:
+                self._before_call()
+                try:
+                    with self._limit():
+                        for chunk in self.model.generate_content(prompt, stream=True, request_options={'timeout': self.timeout}):
+                            if chunk.text:
+                                parts.append(chunk.text)
+                                call.response_chars += len(chunk.text)
+                                yield chunk.text
+                except GeneratorExit:
+                    # The consumer stopped reading; chunks were arriving, so the upstream is healthy.
+                    self.breaker.record_success()
+                    raise
+                except Exception as e:
+                    if parts:
+                        if is_transient(e):
+                            self.breaker.record_failure()
+                        raise
+                    self._after_failure(e, attempt)
+                    call.retries += 1
+                    attempt += 1
+                    continue
+                self.breaker.record_success()
+                break
+        if key is not None:
+            self.cache.set(key, ''.join(parts))
+
+    def _limit(self):
+        return self.limiter if self.limiter is not None else nullcontext()
+
+    def _call(self, prompt):
+        with self._limit():
+            return self.model.generate_content(prompt, request_options={'timeout': self.timeout}).text
+
+    def _call_hedged(self, prompt):
+        # If the first request is slower than hedge_after, race a second one and take whichever answers first.
+        primary = self._hedge_pool.submit(self._call, prompt)
+        done, _ = wait([primary], timeout=self.hedge_after)
+        if done:
+            return primary.result()
+        HEDGES.inc(model=self.model_name)
+        hedge = self._hedge_pool.submit(self._call, prompt)
+        done, pending = wait([primary, hedge], return_when=FIRST_COMPLETED)
+        winner = next(iter(done))
+        if winner.exception() is not None and pending:
+            return next(iter(pending)).result()
+        return winner.result()
+
+    def _before_call(self):
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError:
+            CIRCUIT_REJECTIONS.inc(model=self.model_name)
+            raise
+
+    def _after_failure(self, exc, attempt):
+        # Re-raises unless the error is transient and retries remain; otherwise sleeps with full jitter.
+        if not is_transient(exc):
+            # The upstream answered (e.g. a blocked or invalid prompt), so it is not degraded.
+            self.breaker.record_success()
+            raise exc
+        self.breaker.record_failure()
+        if attempt >= self.max_retries or self.breaker.state == 'open':
+            raise exc
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        logging.warning(f"Gemini call failed ({type(exc).__name__}: {exc}); retry {attempt + 1}/{self.max_retries} in {delay:.2f}s")
+        time.sleep(delay)
+
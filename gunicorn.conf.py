@@ -0,0 +1,47 @@
+# gunicorn.conf.py
+# gunicorn app:app   (this file is picked up automatically from the working directory)
+import os
+
+# The API routes spend almost all their time waiting on Gemini and gTTS. With gevent workers
+# that wait is cooperative, so one process holds hundreds of requests instead of one per thread.
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gevent')
+# One worker: uploaded documents, translation jobs, history and TTS coalescing live in process
+# memory, so a second worker would answer half the polls with "unknown document" or 404.
+# gevent already gives this one process its concurrency.
+workers = int(os.getenv('WEB_CONCURRENCY', '1'))
+if workers > 1 and os.getenv('GUNICORN_ALLOW_MULTIPLE_WORKERS') != '1':
+    raise RuntimeError(
+        f"WEB_CONCURRENCY={workers}: the app keeps per-process state, so run one worker, or set "
+        "GUNICORN_ALLOW_MULTIPLE_WORKERS=1 behind a load balancer with sticky sessions."
+    )
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', '500'))
+threads = int(os.getenv('GUNICORN_THREADS', '8'))
+bind = os.getenv('GUNICORN_BIND', f"0.0.0.0:{os.getenv('PORT', '5000')}")
+# Streamed responses (SSE, audio, ZIPs) can legitimately stay open for minutes.
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '300'))
+graceful_timeout = 30
+
+if worker_class == 'gevent':
+    # Patch before the app (or anything it imports) is loaded, which matters with --preload.
+    from gevent import monkey
+    monkey.patch_all()
+
+    # gRPC does not cooperate with gevent; the REST transport goes through patched sockets.
+    os.environ.setdefault('GEMINI_TRANSPORT', 'rest')
+    # pdfplumber is CPU-bound and would stall the event loop, so every PDF goes to the process pool.
+    os.environ.setdefault('PDF_EXTRACTION_OFFLOAD', '1')
+    # Greenlets are cheap; let the fan-out pool and the in-flight cap scale with the connections.
+    # GEMINI_RATE_PER_SEC still applies and is the real ceiling against the API quota.
+    os.environ.setdefault('LLM_EXECUTOR_WORKERS', str(worker_connections))
+    os.environ.setdefault('GEMINI_MAX_IN_FLIGHT', str(worker_connections))
+    os.environ.setdefault('TTS_WORKERS', '32')
+
+# GUNICORN_PRELOAD=1 (or --preload) imports the app once in the master; workers fork with it loaded.
+preload_app = os.getenv('GUNICORN_PRELOAD', '0') == '1'
+
+
+def when_ready(server):
+    # Runs in the master after a preloaded app is imported and before any worker is forked.
+    if server.cfg.preload_app:
+        import startup
+        startup.warm_up()
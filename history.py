@@ -0,0 +1,131 @@
+# history.py
+import os
+import json
+import sqlite3
+import threading
+import itertools
+from collections import deque
+from datetime import datetime
+
+
+def _preview(text, limit):
+    return text[:limit] + ('...' if len(text) > limit else '')
+
+
+def summarize_result(result, limit=200):
+    # Same shape as the full result, with every string cut down to `limit` characters.
+    if isinstance(result, str):
+        return _preview(result, limit)
+    if isinstance(result, dict):
+        return {key: summarize_result(value, limit) for key, value in result.items()}
+    if isinstance(result, list):
+        return [summarize_result(value, limit) for value in result[:10]]
+    return result
+
+
+def _make_item(item_id, activity_type, content, result):
+    return {
+        'id': item_id,
+        'type': activity_type,
+        'content_preview': _preview(content, 100),
+        'result_preview': summarize_result(result) if result is not None else None,
+        'timestamp': datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S UTC')
+    }
+
+
+class MemoryHistoryStore:
+    """Per-user ring buffer of compact items; full results are kept in a side table."""
+
+    def __init__(self, max_items=100):
+        # At least one item: a zero-length ring buffer has no oldest entry to evict.
+        self.max_items = max(1, max_items)
+        self._items = {}
+        self._results = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def add(self, username, activity_type, content, result=None):
+        with self._lock:
+            item = _make_item(next(self._ids), activity_type, content, result)
+            items = self._items.setdefault(username, deque(maxlen=self.max_items))
+            if len(items) == items.maxlen:
+                self._results.pop((username, items[-1]['id']), None)
+            items.appendleft(item)
+            if result is not None:
+                self._results[(username, item['id'])] = result
+            return item['id']
+
+    def page(self, username, limit=20, cursor=None):
+        limit = max(1, limit)
+        with self._lock:
+            items = self._items.get(username, ())
+            selected = [item for item in items if cursor is None or item['id'] < cursor][:limit + 1]
+        next_cursor = selected[limit - 1]['id'] if len(selected) > limit else None
+        return selected[:limit], next_cursor
+
+    def get_result(self, username, item_id):
+        with self._lock:
+            return self._results.get((username, item_id))
+
+
+class SQLiteHistoryStore:
+    """Same interface as MemoryHistoryStore, persisted to SQLite and trimmed per user."""
+
+    def __init__(self, path, max_items=100):
+        self.path = path
+        self.max_items = max(1, max_items)
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS history (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    username TEXT NOT NULL,
+                    type TEXT NOT NULL,
+                    content_preview TEXT NOT NULL,
+                    result_preview TEXT,
+                    result TEXT,
+                    timestamp TEXT NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS history_user_id ON history (username, id DESC)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10)
+
+    def add(self, username, activity_type, content, result=None):
+        item = _make_item(None, activity_type, content, result)
+        with self._lock, self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO history (username, type, content_preview, result_preview, result, timestamp) VALUES (?, ?, ?, ?, ?, ?)",
+                (username, item['type'], item['content_preview'], json.dumps(item['result_preview']),
+                 json.dumps(result) if result is not None else None, item['timestamp'])
+            )
+            conn.execute(
+                "DELETE FROM history WHERE username = ? AND id NOT IN "
+                "(SELECT id FROM history WHERE username = ? ORDER BY id DESC LIMIT ?)",
+                (username, username, self.max_items)
+            )
+            return cursor.lastrowid
+
+    def page(self, username, limit=20, cursor=None):
+        limit = max(1, limit)
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id, type, content_preview, result_preview, timestamp FROM history "
+                "WHERE username = ? AND id < ? ORDER BY id DESC LIMIT ?",
+                (username, cursor if cursor is not None else 2 ** 63 - 1, limit + 1)
+            ).fetchall()
+        items = [
+            {'id': row[0], 'type': row[1], 'content_preview': row[2], 'result_preview': json.loads(row[3]), 'timestamp': row[4]}
+            for row in rows
+        ]
+        next_cursor = items[limit - 1]['id'] if len(items) > limit else None
+        return items[:limit], next_cursor
+
+    def get_result(self, username, item_id):
+        with self._connect() as conn:
+            row = conn.execute("SELECT result FROM history WHERE username = ? AND id = ?", (username, item_id)).fetchone()
+        return json.loads(row[0]) if row and row[0] else None
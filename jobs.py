@@ -0,0 +1,204 @@
+# jobs.py
+import time
+import queue
+import logging
+import threading
+from collections import OrderedDict
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class JobStore:
+    """Job status entries with TTL eviction and change notification.
+
+    Finished jobs (status other than 'processing') expire `ttl` seconds after their
+    last update; jobs that never finish are dropped after `stale_after` seconds.
+    """
+
+    def __init__(self, ttl=3600, stale_after=6 * 3600, max_entries=10000):
+        self.ttl = ttl
+        self.stale_after = stale_after
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._changed = threading.Condition()
+        self._last_purge = time.monotonic()
+
+    def set(self, job_id, entry):
+        with self._changed:
+            self._entries[job_id] = (entry, time.monotonic())
+            self._entries.move_to_end(job_id)
+            self._purge_locked()
+            self._changed.notify_all()
+
+    def get(self, job_id):
+        with self._changed:
+            item = self._entries.get(job_id)
+            if item is None or self._expired(*item, time.monotonic()):
+                return None
+            return item[0]
+
+    def discard(self, job_id):
+        with self._changed:
+            self._entries.pop(job_id, None)
+            self._changed.notify_all()
+
+    def wait_for_change(self, job_id, last_entry, timeout):
+        """Return the entry for job_id once it differs from last_entry, or after timeout."""
+        with self._changed:
+            self._changed.wait_for(lambda: self._current(job_id) is not last_entry, timeout)
+            return self._current(job_id)
+
+    def __contains__(self, job_id):
+        return self.get(job_id) is not None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _current(self, job_id):
+        item = self._entries.get(job_id)
+        return item[0] if item else None
+
+    def _expired(self, entry, updated, now):
+        limit = self.stale_after if entry.get('status') == 'processing' else self.ttl
+        return now - updated > limit
+
+    def _purge_locked(self):
+        now = time.monotonic()
+        if now - self._last_purge < 30 and len(self._entries) <= self.max_entries:
+            return
+        self._last_purge = now
+        for job_id in [job_id for job_id, item in self._entries.items() if self._expired(*item, now)]:
+            del self._entries[job_id]
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+class InProcessBackend:
+    """Fixed pool of worker threads fed from a bounded queue."""
+
+    def __init__(self, handlers, workers=4, queue_size=32):
+        self.handlers = handlers
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._workers = [
+            threading.Thread(target=self._work, name=f'job-worker-{i}', daemon=True)
+            for i in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, kind, job_id, payload):
+        try:
+            self._queue.put_nowait((self.handlers[kind], job_id, payload))
+        except queue.Full:
+            raise JobQueueFull(f"Job queue is full ({self._queue.maxsize} pending).")
+
+    def status(self, job_id):
+        # Handlers write their own status into the JobStore.
+        return None
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def _work(self):
+        while True:
+            handler, job_id, payload = self._queue.get()
+            try:
+                handler(job_id, **payload)
+            except Exception as e:
+                logging.error(f"Job {job_id} crashed: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+
+class CeleryBackend:
+    """Dispatches jobs to Celery tasks and reads their state from the result backend.
+
+    `tasks` maps a job kind to (celery_task, adapter), where adapter turns the job
+    payload into the task's keyword arguments.
+    """
+
+    _RUNNING_STATES = ('PENDING', 'RECEIVED', 'STARTED', 'RETRY', 'PROGRESS')
+
+    def __init__(self, tasks):
+        self.tasks = tasks
+
+    def submit(self, kind, job_id, payload):
+        task, adapter = self.tasks[kind]
+        task.apply_async(kwargs=adapter(**payload), task_id=job_id)
+
+    def status(self, job_id):
+        from celery.result import AsyncResult
+        task = next(iter(self.tasks.values()))[0]
+        result = AsyncResult(job_id, app=task.app)
+        if result.state in self._RUNNING_STATES:
+            entry = {'status': 'processing', 'result': None}
+            if result.state == 'PROGRESS' and isinstance(result.info, dict):
+                if 'progress' in result.info:
+                    entry['progress'] = result.info['progress']
+                    entry['partial'] = result.info.get('partial')
+                else:
+                    # Workers running an older task report bare chunk counts.
+                    entry['progress'] = result.info
+            return entry
+        if result.state == 'SUCCESS':
+            value = result.result or {}
+            status = 'completed' if value.get('status') == 'SUCCESS' else 'failed'
+            return {'status': status, 'result': value.get('result')}
+        return {'status': 'failed', 'result': {'error': str(result.info)}}
+
+    def pending(self):
+        return None
+
+
+def use_in_memory_broker(celery_app):
+    # Stand-in for Redis in tests: tasks run eagerly and results stay in process memory.
+    celery_app.conf.update(
+        broker_url='memory://',
+        result_backend='cache+memory://',
+        task_always_eager=True,
+        task_store_eager_result=True,
+    )
+    return celery_app
+
+
+class JobEngine:
+    def __init__(self, backend, store, poll_interval=1.0):
+        self.backend = backend
+        self.store = store
+        self.poll_interval = poll_interval
+
+    def submit(self, kind, job_id, **payload):
+        self.store.set(job_id, {'status': 'processing', 'result': None})
+        try:
+            self.backend.submit(kind, job_id, payload)
+        except JobQueueFull:
+            self.store.discard(job_id)
+            raise
+        return job_id
+
+    def status(self, job_id):
+        entry = self.store.get(job_id)
+        if entry is None:
+            return None
+        remote = self.backend.status(job_id)
+        if remote is not None and remote != entry:
+            self.store.set(job_id, remote)
+            return remote
+        return entry
+
+    def wait_for_change(self, job_id, last_entry, timeout):
+        if isinstance(self.backend, InProcessBackend):
+            return self.store.wait_for_change(job_id, last_entry, timeout)
+        # Remote backends cannot signal us, so poll their result store.
+        deadline = time.monotonic() + timeout
+        while True:
+            entry = self.status(job_id)
+            remaining = deadline - time.monotonic()
+            if entry is not last_entry or remaining <= 0:
+                return entry
+            time.sleep(min(self.poll_interval, remaining))
+
+    def stats(self):
+        return {'jobs': len(self.store), 'pending': self.backend.pending()}
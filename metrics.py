@@ -0,0 +1,207 @@
+# metrics.py
+import time
+import threading
+import functools
+from contextlib import contextmanager
+
+# Prometheus text exposition format, implemented in-process so the app needs no client library.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = (100, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000, 250000, 1000000)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple((name, labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def collect(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield f"{self.name}{_format_labels(key)} {_format_value(value)}"
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple((name, labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['counts'][index] += 1
+                    break
+            series['sum'] += value
+            series['count'] += 1
+
+    def collect(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            snapshot = sorted((key, list(series['counts']), series['sum'], series['count'])
+                              for key, series in self._series.items())
+        for key, counts, total, count in snapshot:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield f"{self.name}_bucket{_format_labels(key + (('le', _format_value(float(bound))),))} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(key)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(key)} {count}"
+
+
+class Gauge:
+    """Read at scrape time from `callback`, which returns a number or a {label value: number} dict."""
+
+    def __init__(self, name, documentation, callback, labelname=None):
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+        self.labelname = labelname
+
+    def collect(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} gauge"
+        value = self.callback()
+        if isinstance(value, dict):
+            for label, item in sorted(value.items()):
+                yield f"{self.name}{_format_labels(((self.labelname, label),))} {_format_value(item)}"
+        else:
+            yield f"{self.name} {_format_value(value)}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            # Re-registering a name (e.g. a module reloaded in a shell) keeps the first metric.
+            return self._metrics.setdefault(metric.name, metric)
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            try:
+                lines.extend(metric.collect())
+            except Exception as e:
+                lines.append(f"# {metric.name} failed to collect: {_escape(e)}")
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+def counter(name, documentation, labelnames=()):
+    return registry.register(Counter(name, documentation, labelnames))
+
+
+def histogram(name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+    return registry.register(Histogram(name, documentation, labelnames, buckets))
+
+
+def gauge(name, documentation, callback, labelname=None):
+    return registry.register(Gauge(name, documentation, callback, labelname))
+
+
+STAGE_SECONDS = histogram('demystilex_stage_seconds', 'Time spent in each pipeline stage.', ('stage', 'outcome'))
+LLM_SECONDS = histogram('demystilex_llm_call_seconds', 'Gemini call latency, excluding cache hits.', ('model', 'mode', 'outcome'))
+LLM_PROMPT_CHARS = histogram('demystilex_llm_prompt_chars', 'Prompt size in characters per Gemini call.', ('model',), SIZE_BUCKETS)
+LLM_RESPONSE_CHARS = histogram('demystilex_llm_response_chars', 'Response size in characters per Gemini call.', ('model',), SIZE_BUCKETS)
+LLM_RETRIES = counter('demystilex_llm_retries_total', 'Gemini calls retried after a transient error.', ('model',))
+LLM_CACHE_LOOKUPS = counter('demystilex_llm_cache_lookups_total', 'LLM response cache lookups.', ('result',))
+HTTP_SECONDS = histogram('demystilex_http_request_seconds', 'Time to produce a response (streamed bodies excluded).', ('endpoint', 'method', 'status'))
+
+
+@contextmanager
+def span(stage):
+    """Time a block into demystilex_stage_seconds{stage, outcome}."""
+    start = time.perf_counter()
+    outcome = 'ok'
+    try:
+        yield
+    except BaseException:
+        outcome = 'error'
+        raise
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage, outcome=outcome)
+
+
+def timed(stage):
+    """Decorator form of span()."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+class LLMCall:
+    """Collects one Gemini call's sizes and retries; see llm_call()."""
+
+    def __init__(self, prompt_chars):
+        self.prompt_chars = prompt_chars
+        self.response_chars = 0
+        self.retries = 0
+
+
+@contextmanager
+def llm_call(model, mode, prompt):
+    call = LLMCall(len(prompt))
+    start = time.perf_counter()
+    outcome = 'ok'
+    try:
+        yield call
+    except GeneratorExit:
+        # A streamed response abandoned by the client.
+        outcome = 'cancelled'
+        raise
+    except BaseException:
+        outcome = 'error'
+        raise
+    finally:
+        LLM_SECONDS.observe(time.perf_counter() - start, model=model, mode=mode, outcome=outcome)
+        LLM_PROMPT_CHARS.observe(call.prompt_chars, model=model)
+        if outcome == 'ok':
+            LLM_RESPONSE_CHARS.observe(call.response_chars, model=model)
+        if call.retries:
+            LLM_RETRIES.inc(call.retries, model=model)
@@ -0,0 +1,160 @@
+# normalization.py
+import re
+import math
+import logging
+from collections import Counter
+
+import metrics
+
+# Lines this close to the top or bottom of a page are header/footer candidates.
+EDGE_LINES = 3
+# Header/footer detection needs enough pages to tell a running header from ordinary text.
+MIN_PAGES_FOR_REPEATS = 3
+REPEAT_FRACTION = 0.6
+# Running headers and footers are short labels; longer lines are content even when they repeat.
+MAX_HEADER_CHARS = 60
+# A bare number is only a page number when it counts up with the pages, at the same edge, on this share of them.
+MIN_PAGES_FOR_NUMBERS = 2
+PAGE_NUMBER_FRACTION = 0.5
+
+_PAGE_NUMBER = re.compile(r'^(?:page\s*)?[-–—(\[]?\s*\d{1,3}\s*[-–—)\]]?(?:\s*(?:of|/)\s*\d{1,3})?$', re.IGNORECASE)
+_DIGITS = re.compile(r'\d+')
+_CLAUSE_NUMBER = re.compile(r'\(?(?:\d+(?:\.\d+)*|[a-z]|[ivxlc]+)[.)]\s', re.IGNORECASE)
+_SPACES = re.compile(r'[ \t\u00a0]+')
+# "agree-\nment" -> "agreement"; only when the next line carries on in lower case.
+_HYPHEN_BREAK = re.compile(r'(?<=[^\W\d_])-\n(?=[a-z])')
+# A line that stops mid-sentence and continues in lower case on the next line, unless that line is a list item ("a)", "(iv)").
+_BROKEN_LINE = re.compile(r'(?<=[^\s.:;!?])\n(?=[a-z])(?!\(?(?:[a-z]|[ivxlc]+)[.)]\s)')
+_BLANK_LINES = re.compile(r'\n{3,}')
+
+NORMALIZED_CHARS = metrics.counter('demystilex_normalization_chars_total',
+                                   'Characters of prompt text before and after normalization.', ('phase',))
+
+
+def _signature(line):
+    # Running headers often carry the page number or date, so digits are ignored when comparing.
+    return _DIGITS.sub('#', _SPACES.sub(' ', line).strip().lower())
+
+
+def _edge_indexes(lines):
+    filled = [i for i, line in enumerate(lines) if line.strip()]
+    return filled[:EDGE_LINES], filled[-EDGE_LINES:][::-1]
+
+
+def _page_number(line):
+    """(format, number) for a line that holds only a page number, e.g. ('page # of #', 3); otherwise None."""
+    line = _SPACES.sub(' ', line).strip()
+    if not _PAGE_NUMBER.match(line):
+        return None
+    return _DIGITS.sub('#', line.lower()), int(_DIGITS.search(line).group())
+
+
+def find_page_numbers(pages):
+    """(edge, format, offset) of page-number lines that follow the page sequence; offset = number - page index."""
+    if len(pages) < MIN_PAGES_FOR_NUMBERS:
+        return set()
+    counts = Counter()
+    for index, page in enumerate(pages):
+        lines = page.split('\n')
+        for edge, indexes in zip(('top', 'bottom'), _edge_indexes(lines)):
+            found = (_page_number(lines[i]) for i in indexes)
+            counts.update({(edge, number_format, number - index) for number_format, number in filter(None, found)})
+    threshold = max(MIN_PAGES_FOR_NUMBERS, math.ceil(len(pages) * PAGE_NUMBER_FRACTION))
+    return {key for key, count in counts.items() if count >= threshold}
+
+
+def _header_candidate(line):
+    """True for lines that could be a running header or footer: short, not a sentence, not a numbered clause."""
+    line = _SPACES.sub(' ', line).strip()
+    return (0 < len(line) <= MAX_HEADER_CHARS and not line.endswith(('.', ',', ';', ':'))
+            and not _CLAUSE_NUMBER.match(line) and not _page_number(line))
+
+
+def find_repeated_lines(pages):
+    """Signatures of lines that sit at the same edge (top or bottom) of most pages and never mid-page."""
+    if len(pages) < MIN_PAGES_FOR_REPEATS:
+        return set()
+    top_counts, bottom_counts, middle = Counter(), Counter(), set()
+    for page in pages:
+        lines = page.split('\n')
+        top, bottom = _edge_indexes(lines)
+        # Page numbers are left to find_page_numbers, which also checks that they count up.
+        top_counts.update({_signature(lines[i]) for i in top if _header_candidate(lines[i])})
+        bottom_counts.update({_signature(lines[i]) for i in bottom if _header_candidate(lines[i])})
+        edges = set(top + bottom)
+        middle.update(_signature(line) for i, line in enumerate(lines) if line.strip() and i not in edges)
+    threshold = max(MIN_PAGES_FOR_REPEATS, math.ceil(len(pages) * REPEAT_FRACTION))
+    repeated = {signature for counts in (top_counts, bottom_counts) for signature, count in counts.items() if count >= threshold}
+    # Body text that also occurs mid-page (e.g. boilerplate repeated in every clause) is content, not a header.
+    return {signature for signature in repeated if signature.strip('# ') and signature not in middle}
+
+
+def _is_page_number(line, edge, index, page_numbers):
+    found = _page_number(line)
+    return found is not None and (edge, found[0], found[1] - index) in page_numbers
+
+
+def _strip_edges(page, index, repeated, page_numbers):
+    lines = page.split('\n')
+    removed = set()
+    for edge, indexes in zip(('top', 'bottom'), _edge_indexes(lines)):
+        # Walk inwards from each edge and stop at the first line that is real content.
+        for i in indexes:
+            line = lines[i].strip()
+            if _is_page_number(line, edge, index, page_numbers) or _signature(line) in repeated:
+                removed.add(i)
+            else:
+                break
+    return '\n'.join(line for i, line in enumerate(lines) if i not in removed), len(removed)
+
+
+def clean_text(text):
+    """Join hyphenated and broken lines and collapse runs of whitespace."""
+    text = '\n'.join(_SPACES.sub(' ', line).strip() for line in text.split('\n'))
+    text = _HYPHEN_BREAK.sub('', text)
+    text = _BROKEN_LINE.sub(' ', text)
+    return _BLANK_LINES.sub('\n\n', text).strip()
+
+
+@metrics.timed('normalize')
+def normalize_pages(pages, separator='\n', page_numbers=True):
+    """Prompt-ready text from extracted pages; returns (text, stats)."""
+    repeated = find_repeated_lines(pages)
+    numbers = find_page_numbers(pages) if page_numbers else set()
+    cleaned, removed_lines = [], 0
+    for index, page in enumerate(pages):
+        page, removed = _strip_edges(page, index, repeated, numbers)
+        removed_lines += removed
+        cleaned.append(clean_text(page))
+    if separator == '\f':
+        text = '\f'.join(cleaned)
+    else:
+        text = ''.join(page + separator for page in cleaned if page)
+    before = sum(len(page) for page in pages)
+    NORMALIZED_CHARS.inc(before, phase='before')
+    NORMALIZED_CHARS.inc(len(text), phase='after')
+    return text, {'chars_before': before, 'chars_after': len(text), 'edge_lines_removed': removed_lines}
+
+
+def normalize_text(text):
+    """normalize_pages() for text that is not split into pages, e.g. pasted into a form.
+
+    Page numbers are never stripped here: in pasted text a short number on its own line is usually content.
+    """
+    if not text:
+        return text, {'chars_before': 0, 'chars_after': 0, 'edge_lines_removed': 0}
+    return normalize_pages(text.split('\f'), separator='\f', page_numbers=False)
+
+
+def normalize_document(pages, filename):
+    """normalize_pages() for an uploaded file, joined like extraction does (.txt pages by form feeds); logs the saving."""
+    text, stats = normalize_pages(pages, separator='\f' if filename.lower().endswith('.txt') else '\n')
+    log_stats(filename, stats)
+    return text, stats
+
+
+def log_stats(source, stats):
+    before, after = stats['chars_before'], stats['chars_after']
+    saved = 100 * (before - after) / before if before else 0.0
+    logging.info(f"Normalized {source}: {before} -> {after} chars ({saved:.1f}% smaller, "
+                 f"{stats['edge_lines_removed']} header/footer/page-number lines removed)")
@@ -0,0 +1,87 @@
+# retrieval.py
+import re
+import math
+import threading
+from collections import Counter, OrderedDict
+
+from chunking import split_into_chunks
+
+_TOKEN = re.compile(r'[a-z0-9]+')
+_STOPWORDS = frozenset("""
+a an and are as at be by can do does for from has have how i if in is it its me my no not of on or shall
+should so than that the their then there these they this to was what when where which who will with would
+you your
+""".split())
+
+
+def tokenize(text):
+    return [token for token in _TOKEN.findall(text.lower()) if token not in _STOPWORDS]
+
+
+class BM25Index:
+    """Okapi BM25 over a fixed list of text chunks."""
+
+    def __init__(self, chunks, k1=1.5, b=0.75):
+        self.chunks = chunks
+        self.k1 = k1
+        self.b = b
+        self._term_freqs = [Counter(tokenize(chunk)) for chunk in chunks]
+        self._lengths = [sum(freqs.values()) for freqs in self._term_freqs]
+        self._avg_length = (sum(self._lengths) / len(self._lengths)) if self._lengths else 0.0
+        doc_freqs = Counter()
+        for freqs in self._term_freqs:
+            doc_freqs.update(freqs.keys())
+        n = len(chunks)
+        self._idf = {term: math.log(1 + (n - df + 0.5) / (df + 0.5)) for term, df in doc_freqs.items()}
+
+    @classmethod
+    def from_text(cls, text, chunk_tokens=300):
+        return cls(split_into_chunks(text, chunk_tokens))
+
+    def search(self, query, top_k=4):
+        terms = [term for term in set(tokenize(query)) if term in self._idf]
+        if not terms:
+            return []
+        scores = []
+        for index, freqs in enumerate(self._term_freqs):
+            length_norm = 1 - self.b + self.b * (self._lengths[index] / self._avg_length if self._avg_length else 0)
+            score = 0.0
+            for term in terms:
+                tf = freqs.get(term)
+                if tf:
+                    score += self._idf[term] * tf * (self.k1 + 1) / (tf + self.k1 * length_norm)
+            if score > 0:
+                scores.append((score, index))
+        scores.sort(reverse=True)
+        return [(index, score) for score, index in scores[:top_k]]
+
+
+class IndexStore:
+    """Bounded LRU of BM25 indexes, keyed by document id."""
+
+    def __init__(self, max_entries=128, chunk_tokens=300):
+        self.max_entries = max_entries
+        self.chunk_tokens = chunk_tokens
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, index_id):
+        with self._lock:
+            index = self._indexes.get(index_id)
+            if index is not None:
+                self._indexes.move_to_end(index_id)
+            return index
+
+    def build(self, index_id, text):
+        index = self.get(index_id)
+        if index is not None:
+            return index
+        index = BM25Index.from_text(text, self.chunk_tokens)
+        with self._lock:
+            self._indexes[index_id] = index
+            while len(self._indexes) > self.max_entries:
+                self._indexes.popitem(last=False)
+        return index
+
+    def __len__(self):
+        return len(self._indexes)
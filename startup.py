@@ -0,0 +1,74 @@
+# startup.py
+import os
+import sys
+import time
+import logging
+import importlib
+import threading
+
+import metrics
+
+# Slow to import and only needed by some endpoints, so they are loaded on first use via load().
+HEAVY_MODULES = ('google.generativeai', 'gtts', 'pdfplumber', 'fpdf')
+STARTUP_BUDGET_SECONDS = float(os.getenv('STARTUP_BUDGET_SECONDS', '2.0'))
+
+_import_seconds = {}
+_lock = threading.Lock()
+
+
+def record(name, seconds):
+    with _lock:
+        _import_seconds.setdefault(name, seconds)
+
+
+def import_times():
+    with _lock:
+        return dict(_import_seconds)
+
+
+IMPORT_SECONDS = metrics.gauge('demystilex_import_seconds', 'Time spent importing each module in this process.',
+                               import_times, 'module')
+
+
+def load(name):
+    """Import a module on first use and record how long the import took."""
+    if name in sys.modules:
+        # Not sys.modules[name]: import_module waits if another thread is still executing the import.
+        return importlib.import_module(name)
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    seconds = time.perf_counter() - start
+    record(name, seconds)
+    # Lazy imports happen after report() has run at boot, so each one is logged when it is paid.
+    logging.info(f"Imported {name} on first use in {seconds * 1000:.0f}ms")
+    return module
+
+
+def warm_up(modules=HEAVY_MODULES):
+    # For `gunicorn --preload`: pay the imports once in the master so forked workers share them.
+    # Nothing that holds sockets or threads (Gemini client, process pools) is created here.
+    for name in modules:
+        try:
+            load(name)
+        except ImportError as e:
+            logging.warning(f"Warm-up could not import {name}: {e}")
+    import agreement_pdf
+    with metrics.span('warm_up'):
+        agreement_pdf.get_template()
+    report()
+
+
+def report(budget=STARTUP_BUDGET_SECONDS):
+    """Log import times, slowest first, and warn when the app's own import exceeds the budget.
+
+    'app' is the whole app module import, 'app_imports' the part of it spent in its top-level imports.
+    """
+    times = import_times()
+    if not times:
+        return times
+    summary = ', '.join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in sorted(times.items(), key=lambda item: -item[1]))
+    logging.info(f"Startup import times: {summary}")
+    boot = times.get('app')
+    if boot is not None and budget and boot > budget:
+        logging.warning(f"App import took {boot:.2f}s, over the {budget:.2f}s startup budget")
+    return times
@@ -52,7 +52,7 @@ document.addEventListener('DOMContentLoaded', () => {
                     formData.append('text', textToDemystify);
                 }
 
-                const response = await fetch('/api/demystify', {
+                const response = await fetch('/api/demystify/stream', {
                     method: 'POST',
                     body: formData
                 });
@@ -72,17 +72,27 @@ document.addEventListener('DOMContentLoaded', () => {
                     return;
                 }
 
-                // The response is good, so parse the JSON
-                const data = await response.json();
-
-                // Update the output with the demystified content
-                explanationOutput.innerText = data.explanation || 'No explanation returned';
-                if (data.mindmap_data) {
-                    // Assuming renderMindMap function is defined in mindmap.js
-                    renderMindMap(mindmapContainer, data.mindmap_data);
-                } else {
-                    mindmapContainer.innerHTML = '<p>No mind map could be generated for this document.</p>';
-                }
+                // Show the explanation as soon as the first tokens arrive
+                resultsContainer.style.display = 'block';
+                explanationOutput.innerText = '';
+                mindmapContainer.innerHTML = '<p>Generating mind map...</p>';
+                let explanation = '';
+                await readEventStream(response, (event, data) => {
+                    if (event === 'explanation') {
+                        explanation += data.text;
+                        explanationOutput.innerText = explanation;
+                    } else if (event === 'mindmap') {
+                        if (data.mindmap_data) {
+                            // Assuming renderMindMap function is defined in mindmap.js
+                            renderMindMap(mindmapContainer, data.mindmap_data);
+                        } else {
+                            mindmapContainer.innerHTML = '<p>No mind map could be generated for this document.</p>';
+                        }
+                    } else if (event === 'error') {
+                        throw new Error(data.error);
+                    }
+                });
+                if (!explanation) explanationOutput.innerText = 'No explanation returned';
                 resultsContainer.style.display = 'block';
                 showFeedback('Demystification successful!', true);
 
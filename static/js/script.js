@@ -62,4 +62,29 @@ async function handleSpeakButtonClick() {
     }
 }
 
-// CRITICAL FIX: The extra '}' that was here has been removed.
\ No newline at end of file
+// CRITICAL FIX: The extra '}' that was here has been removed.
+
+// Reads a text/event-stream response body (from a POST, which EventSource cannot send)
+// and calls onEvent(eventName, data) for every complete event.
+async function readEventStream(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const rawEvent = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            let eventName = 'message';
+            let data = '';
+            rawEvent.split('\n').forEach(line => {
+                if (line.startsWith('event:')) eventName = line.slice(6).trim();
+                else if (line.startsWith('data:')) data += line.slice(5).trim();
+            });
+            onEvent(eventName, data ? JSON.parse(data) : {});
+        }
+    }
+}
@@ -101,8 +101,41 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     });
 
-    // Function to start polling the server for translation status
+    // Listen for pushed status changes; fall back to polling if the stream is unavailable
     function startPolling(taskId, selectedLanguages) {
+        if (!window.EventSource) {
+            pollStatus(taskId, selectedLanguages);
+            return;
+        }
+        const source = new EventSource(`/api/translation_events/${taskId}`);
+        let finished = false;
+        source.addEventListener('completed', (event) => {
+            finished = true;
+            source.close();
+            loadingSpinner.style.display = 'none';
+            displayTranslations(JSON.parse(event.data).result.translations, selectedLanguages);
+        });
+        source.addEventListener('failed', (event) => {
+            finished = true;
+            source.close();
+            const data = JSON.parse(event.data);
+            displayError(data.result ? data.result.error : 'Translation failed. Please try again.');
+        });
+        source.addEventListener('timeout', () => {
+            finished = true;
+            source.close();
+            pollStatus(taskId, selectedLanguages);
+        });
+        source.onerror = () => {
+            if (finished) return;
+            finished = true;
+            source.close();
+            pollStatus(taskId, selectedLanguages);
+        };
+    }
+
+    // Function to poll the server for translation status
+    function pollStatus(taskId, selectedLanguages) {
         const intervalId = setInterval(async() => {
             try {
                 const response = await fetch(`/api/translation_status/${taskId}`);
@@ -1,18 +1,18 @@
 # tasks.py
 import os
-import threading
 import json
-import uuid
-import io
-import hashlib
 import logging
 from celery import Celery
 from dotenv import load_dotenv
+from concurrency import get_executor
+from gemini_client import GeminiClient
+from chunking import split_into_chunks, join_translated_chunks
+from concurrent.futures import as_completed
 
 # Import your existing utility functions (you might move them to a separate utils.py file)
-import google.generativeai as genai
-import pdfplumber
-import PyPDF2
+import extraction
+import translation_memory
+import normalization
 
 # --- Celery Configuration ---
 # The broker URL points to your running Redis server.
@@ -20,37 +20,56 @@ celery = Celery(__name__, broker='redis://localhost:6379/0', backend='redis://lo
 
 # Load environment variables
 load_dotenv('gemini.env')
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
+
+# Each worker process gets its own cap, so size the GEMINI_* limits per process.
+gemini = GeminiClient.from_env()
+llm_executor = get_executor(int(os.getenv('LLM_EXECUTOR_WORKERS', '16')))
+TRANSLATION_CHUNK_TOKENS = int(os.getenv('TRANSLATION_CHUNK_TOKENS', '1500'))
+# Point this at the same file as the web app so both share one translation memory.
+TRANSLATION_MEMORY_PATH = os.getenv('TRANSLATION_MEMORY_PATH', os.path.join('instance', 'translation_memory.db'))
+translation_store = translation_memory.TranslationMemory(
+    TRANSLATION_MEMORY_PATH,
+    max_entries=int(os.getenv('TRANSLATION_MEMORY_MAX_ENTRIES', '200000'))
+) if TRANSLATION_MEMORY_PATH else None
 
 # --- Utility Functions (moved from app.py) ---
 def extract_text_from_file(file_content, filename):
-    text = ""
     try:
-        if filename.lower().endswith('.txt'):
-            text = file_content.decode('utf-8')
-        elif filename.lower().endswith('.pdf'):
-            with pdfplumber.open(io.BytesIO(file_content)) as pdf:
-                for page in pdf.pages:
-                    page_text = page.extract_text()
-                    if page_text: text += page_text + "\n"
+        pages = extraction.extract_pages(file_content, filename)
+        text, _ = normalization.normalize_document(pages, filename)
         return text, None
     except Exception as e:
         return None, f"File extraction failed: {str(e)}"
 
+def translate_segments_with_gemini(segments, lang):
+    prompt = f"""
+    Translate each segment of the following legal document text into {lang}.
+    The segments are consecutive sentences of the same document.
+    Return only a JSON array of {len(segments)} strings: the translations, in the same order.
+
+    {json.dumps(segments, ensure_ascii=False, indent=0)}
+    """
+    return json.loads(gemini.generate(prompt).strip().replace('```json', '').replace('```', ''))
+
 def translate_text_with_gemini(text, lang):
+    """Returns (translated, translation memory stats, error)."""
     try:
-        model = genai.GenerativeModel('gemini-1.5-flash')
+        if translation_store is not None:
+            try:
+                translated, stats = translation_memory.translate(
+                    translation_store, text, lang, lambda segments: translate_segments_with_gemini(segments, lang)
+                )
+                return translated.strip(), stats, None
+            except ValueError as e:
+                logging.warning(f"Segment translation to {lang} was unusable, translating the chunk whole: {str(e)}")
         prompt = f"Translate the following text into {lang}. Provide only the translated text:\n\n{text}"
-        response = model.generate_content(prompt)
-        return response.text.strip(), None
+        return gemini.generate(prompt).strip(), None, None
     except Exception as e:
-        return None, f"Translation error: {str(e)}"
+        return None, None, f"Translation error: {str(e)}"
 
 # --- Celery Task Definition ---
-@celery.task
-def run_translation_task(username, content_bytes, filename, languages, is_file=False):
+@celery.task(bind=True)
+def run_translation_task(self, username, content_bytes, filename, languages, is_file=False):
     """This is now a Celery task that runs in a separate worker process."""
     error = None
     text_to_translate = None
@@ -64,10 +83,45 @@ def run_translation_task(username, content_bytes, filename, languages, is_file=F
         # but for now, we'll return a dictionary.
         return {'status': 'FAILED', 'result': {'error': error}}
 
+    chunks = split_into_chunks(text_to_translate, TRANSLATION_CHUNK_TOKENS)
+    partial = {lang: [None] * len(chunks) for lang in languages}
+    errors = {lang: [] for lang in languages}
+    completed = {lang: 0 for lang in languages}
+    memory_stats = {lang: {'segments': 0, 'hits': 0, 'model_calls': 0} for lang in languages}
+    futures = {
+        llm_executor.submit(translate_text_with_gemini, chunk, lang): (lang, index)
+        for lang in languages for index, chunk in enumerate(chunks)
+    }
+    for future in as_completed(futures):
+        lang, index = futures[future]
+        translated, stats, err = future.result()
+        if err:
+            errors[lang].append(err)
+        else:
+            partial[lang][index] = translated
+            for name, value in (stats or {'model_calls': 1}).items():
+                memory_stats[lang][name] += value
+        completed[lang] += 1
+        # Same progress/partial shape as the in-process job, so status polling and the SSE stream work unchanged.
+        self.update_state(state='PROGRESS', meta={
+            'progress': {
+                'completed_chunks': sum(completed.values()),
+                'total_chunks': len(futures),
+                'languages': {lang_code: {'completed': done, 'total': len(chunks)} for lang_code, done in completed.items()}
+            },
+            'partial': {lang_code: list(parts) for lang_code, parts in partial.items()}
+        })
+
     translations = {}
     for lang in languages:
-        translated, err = translate_text_with_gemini(text_to_translate, lang)
-        translations[lang] = {'error': err} if err else {'translated': translated}
+        if errors[lang] and len(errors[lang]) == len(chunks):
+            translations[lang] = {'error': errors[lang][0]}
+        else:
+            parts = [part if part is not None else chunks[index] for index, part in enumerate(partial[lang])]
+            translations[lang] = {'translated': join_translated_chunks(chunks, parts)}
     
+    result = {'translations': translations}
+    if translation_store is not None:
+        result['translation_memory'] = translation_memory.job_report(memory_stats)
     # The return value of a Celery task is its result.
-    return {'status': 'SUCCESS', 'result': {'translations': translations}}
\ No newline at end of file
+    return {'status': 'SUCCESS', 'result': result}
@@ -0,0 +1,35 @@
+# tests/conftest.py
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'benchmarks')]
+
+# The app writes sessions, audio and SQLite files relative to the working directory.
+_workdir = tempfile.mkdtemp(prefix='demystilex-tests-')
+os.chdir(_workdir)
+os.environ.setdefault('GEMINI_API_KEY', 'test-key')
+os.environ.setdefault('SECRET_KEY', 'test-secret')
+os.environ['TRANSLATION_MEMORY_PATH'] = os.path.join(_workdir, 'translation_memory.db')
+
+
+@pytest.fixture(scope='session')
+def fake_gemini():
+    from fake_gemini import FakeGemini
+    return FakeGemini(latency=0.005, jitter=0.0, seed=1).install()
+
+
+@pytest.fixture(scope='session')
+def app_module(fake_gemini):
+    import app
+    return app
+
+
+@pytest.fixture
+def client(app_module):
+    client = app_module.app.test_client()
+    client.post('/login', data={'username': 'user1', 'password': 'password123'})
+    return client
@@ -0,0 +1,44 @@
+# tests/test_agreement_pdf.py
+import io
+import os
+import zipfile
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+import agreement_pdf
+from concurrency import ProcessPool
+
+
+def test_symbols_outside_latin1_are_spelled_out():
+    rows = agreement_pdf.parse_batch_rows(payload={'rows': [{'tenant_name': 'Ravi ₹', 'additional_clauses': '“No pets”'}]})
+    fields = agreement_pdf.agreement_fields(rows[0])
+    assert fields['tenant_name'] == 'Ravi Rs.' and fields['additional_clauses'] == '"No pets"'
+    assert agreement_pdf.render_agreement(rows[0]).startswith(b'%PDF')
+
+
+def test_rows_the_font_cannot_show_are_rejected_up_front():
+    with pytest.raises(agreement_pdf.BatchError, match='Row 2: tenant_name'):
+        agreement_pdf.parse_batch_rows(payload=[{'tenant_name': 'Ravi'}, {'tenant_name': 'रवि'}])
+
+
+def test_render_many_returns_row_errors_as_strings():
+    results = agreement_pdf.render_many([('ok.pdf', {'tenant_name': 'Ravi'}), ('bad.pdf', {'tenant_name': 'रवि'})])
+    assert results[0][1].startswith(b'%PDF') and results[0][2] is None
+    assert results[1][1] is None and 'tenant_name' in results[1][2]
+
+
+def test_process_pool_is_rebuilt_after_a_worker_dies():
+    pool = ProcessPool(1, name='test')
+    with pytest.raises(BrokenProcessPool):
+        pool.submit(os._exit, 1).result(timeout=60)
+    assert pool.submit(abs, -3).result(timeout=60) == 3
+
+
+def test_batch_with_rupee_symbol_renders(client):
+    response = client.post('/api/draft_pdf/batch', json={'rows': [{'tenant_name': 'Ravi ₹'}, {'tenant_name': 'Asha'}]})
+    assert response.status_code == 200
+    with zipfile.ZipFile(io.BytesIO(response.data)) as archive:
+        assert len(archive.namelist()) == 2 and 'errors.txt' not in archive.namelist()
+    response = client.post('/api/draft_pdf/batch', json={'rows': [{'tenant_name': 'रवि'}]})
+    assert response.status_code == 400
@@ -0,0 +1,21 @@
+# tests/test_chat.py
+import pytest
+
+from fixtures import agreement_text
+
+
+@pytest.fixture
+def chat_client(client):
+    client.post('/api/demystify', data={'text': agreement_text(3)})
+    return client
+
+
+@pytest.mark.parametrize('top_k', [-3, 0, 1000, 'many'])
+def test_chat_rejects_out_of_range_top_k(chat_client, top_k):
+    response = chat_client.post('/api/chat', json={'question': 'What is the rent?', 'top_k': top_k})
+    assert response.status_code == 400
+
+
+def test_chat_accepts_a_valid_top_k(chat_client):
+    response = chat_client.post('/api/chat', json={'question': 'What is the rent?', 'top_k': 2})
+    assert response.status_code == 200
@@ -0,0 +1,45 @@
+# tests/test_date_extractor.py
+from datetime import date
+
+from date_extractor import add_period, find_date_candidates, resolve_offline
+
+
+def dates(text):
+    return [(item['source_text'], item['date']) for item in resolve_offline(find_date_candidates(text))]
+
+
+def test_absolute_dates_in_common_formats():
+    text = ("This agreement is made on the 1st day of January, 2024. Rent is due from 05/02/2024. "
+            "It was signed on March 3, 2024 and registered on 2024-03-10. The invalid 31/02/2024 is kept as text.")
+    assert dates(text) == [
+        ('1st day of January, 2024', '2024-01-01'),
+        ('05/02/2024', '2024-02-05'),
+        ('March 3, 2024', '2024-03-03'),
+        ('2024-03-10', '2024-03-10'),
+        ('31/02/2024', '31/02/2024'),
+    ]
+
+
+def test_relative_periods_resolve_against_a_date_in_the_same_sentence():
+    text = "The tenancy commences on 05/01/2024 and is valid for eleven (11) months from that date."
+    assert dates(text)[-1] == ('eleven (11) months', '2024-12-05')
+
+
+def test_relative_periods_refer_to_the_agreement_date():
+    text = "Made on 31/01/2024. The lock-in ends 1 month from the commencement of this agreement."
+    assert dates(text)[-1] == ('1 month', '2024-02-29')
+
+
+def test_notice_periods_stay_durations():
+    text = "Made on 01/01/2024. Either party may terminate with two months notice."
+    assert dates(text)[-1] == ('two months', '2 months')
+
+
+def test_periods_past_year_9999_are_skipped():
+    text = "The lease commences on 01/01/9999 and runs for 999 years from that date."
+    assert dates(text) == [('01/01/9999', '9999-01-01')]
+
+
+def test_add_period_clamps_to_the_end_of_the_month():
+    assert add_period(date(2024, 1, 31), 1, 'month') == date(2024, 2, 29)
+    assert add_period(date(2024, 2, 29), 1, 'year') == date(2025, 2, 28)
@@ -0,0 +1,22 @@
+# tests/test_document_store.py
+import pytest
+
+import extraction
+from document_store import DocumentStore
+
+
+def test_failed_extraction_does_not_leave_a_pending_entry(monkeypatch):
+    store = DocumentStore()
+    real_extract = extraction.extract_pages
+
+    def failing(data, filename, **kwargs):
+        raise extraction.ExtractionError("Failed to process the file.")
+
+    monkeypatch.setattr(extraction, 'extract_pages', failing)
+    with pytest.raises(extraction.ExtractionError):
+        store.add(b'The rent is due monthly.', 'lease.txt')
+    assert store._pending == {}
+
+    monkeypatch.setattr(extraction, 'extract_pages', real_extract)
+    document = store.add(b'The rent is due monthly.', 'lease.txt')
+    assert document['text'] == 'The rent is due monthly.'
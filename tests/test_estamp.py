@@ -0,0 +1,34 @@
+# tests/test_estamp.py
+import io
+import zipfile
+
+from fixtures import ESTAMP_LINE, estamp_zip
+
+
+def corrupt_zip():
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_STORED) as archive:
+        archive.writestr('good.txt', ESTAMP_LINE.format(1))
+        archive.writestr('bad.txt', 'CORRUPT-ME ' + ESTAMP_LINE.format(2))
+    # Changing stored bytes after the CRC was written makes reading that member fail.
+    return buffer.getvalue().replace(b'CORRUPT-ME', b'corrupt-me')
+
+
+def test_unreadable_member_is_reported_per_file(client):
+    response = client.post('/api/verify_estamp/batch', data={'files': (io.BytesIO(corrupt_zip()), 'stamps.zip')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 200
+    results = {result['filename']: result for result in response.get_json()['results']}
+    assert results['stamps.zip/good.txt']['uins'] == [{'uin': 'IN-KA000000000001W', 'page': 1}]
+    assert results['stamps.zip/bad.txt']['status'] == 'error'
+
+
+def test_batch_results_keep_the_upload_order(client, monkeypatch):
+    import estamp
+    monkeypatch.setattr(estamp, 'BATCH_IN_FLIGHT', 2)
+    archive = estamp_zip([(f"{index}.txt", ESTAMP_LINE.format(index)) for index in range(5)])
+    response = client.post('/api/verify_estamp/batch', data={'files': (io.BytesIO(archive), 'stamps.zip')},
+                           content_type='multipart/form-data')
+    results = response.get_json()['results']
+    assert [result['filename'] for result in results] == [f"stamps.zip/{index}.txt" for index in range(5)]
+    assert all(result['status'] == 'found' for result in results)
@@ -0,0 +1,60 @@
+# tests/test_gemini_client.py
+import pytest
+
+from gemini_client import GeminiClient, CircuitBreaker
+
+
+def test_from_env_reads_limits_and_breaker_settings(monkeypatch):
+    monkeypatch.setenv('GEMINI_MAX_IN_FLIGHT', '3')
+    monkeypatch.setenv('GEMINI_MAX_RETRIES', '1')
+    monkeypatch.setenv('GEMINI_HEDGE_AFTER', '2.5')
+    monkeypatch.setenv('GEMINI_BREAKER_FAILURES', '7')
+    monkeypatch.setenv('GEMINI_TRANSPORT', 'rest')
+    client = GeminiClient.from_env(cache=None)
+    assert client.limiter.max_in_flight == 3
+    assert client.max_retries == 1
+    assert client.hedge_after == 2.5
+    assert client.breaker.failure_threshold == 7
+    assert client._transport == 'rest'
+
+
+def test_open_circuit_returns_503_with_retry_after(client, app_module, monkeypatch):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=12.3)
+    breaker.record_failure()
+    monkeypatch.setattr(app_module.gemini, 'breaker', breaker)
+    response = client.post('/api/chat', json={'question': 'What is a lease?'})
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '13'
+    assert response.get_json()['retry_after'] == 13
+
+
+class FlakyModel:
+    def __init__(self, errors):
+        self.errors = list(errors)
+
+    def generate_content(self, prompt, request_options=None):
+        if self.errors:
+            raise self.errors.pop(0)
+        return type('Response', (), {'text': 'ok'})()
+
+
+def test_rest_transport_errors_are_retried_and_count_against_the_breaker(monkeypatch):
+    from requests import exceptions as requests_exceptions
+    monkeypatch.setattr('gemini_client.time.sleep', lambda seconds: None)
+    client = GeminiClient(max_retries=3, breaker=CircuitBreaker(failure_threshold=5))
+    client._model = FlakyModel([requests_exceptions.ConnectionError('reset'), requests_exceptions.Timeout('slow')])
+    assert client.generate('hello') == 'ok'
+
+    breaker = CircuitBreaker(failure_threshold=2)
+    client = GeminiClient(max_retries=3, breaker=breaker)
+    client._model = FlakyModel([requests_exceptions.ReadTimeout('slow')] * 4)
+    with pytest.raises(requests_exceptions.ReadTimeout):
+        client.generate('hello')
+    assert breaker.state == 'open'
+
+
+def test_hedge_pool_is_sized_from_the_in_flight_cap(monkeypatch):
+    monkeypatch.setenv('GEMINI_MAX_IN_FLIGHT', '500')
+    monkeypatch.setenv('GEMINI_HEDGE_AFTER', '1')
+    client = GeminiClient.from_env()
+    assert client._hedge_pool._max_workers == 1000
@@ -0,0 +1,28 @@
+# tests/test_history.py
+import pytest
+
+from history import MemoryHistoryStore, SQLiteHistoryStore
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def make_store(request, tmp_path):
+    if request.param == 'memory':
+        return MemoryHistoryStore
+    return lambda max_items: SQLiteHistoryStore(str(tmp_path / 'history.db'), max_items=max_items)
+
+
+def test_zero_max_items_keeps_the_latest_item(make_store):
+    store = make_store(max_items=0)
+    store.add('user1', 'Chat', 'first', result={'answer': 1})
+    latest = store.add('user1', 'Chat', 'second', result={'answer': 2})
+    items, next_cursor = store.page('user1', limit=0)
+    assert [item['id'] for item in items] == [latest] and next_cursor is None
+    assert store.get_result('user1', latest) == {'answer': 2}
+
+
+def test_pages_follow_the_cursor(make_store):
+    store = make_store(max_items=10)
+    ids = [store.add('user1', 'Chat', f"question {n}") for n in range(5)]
+    first, cursor = store.page('user1', limit=3)
+    second, end = store.page('user1', limit=3, cursor=cursor)
+    assert [item['id'] for item in first + second] == ids[::-1] and end is None
@@ -0,0 +1,172 @@
+# tests/test_jobs.py
+import time
+import threading
+
+import pytest
+
+import jobs
+from jobs import JobStore, JobEngine, JobQueueFull, InProcessBackend, CeleryBackend, use_in_memory_broker
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class ScriptedBackend:
+    """Plays back remote statuses in order, like a result backend being polled; the last one repeats."""
+
+    def __init__(self, entries):
+        self.entries = list(entries)
+
+    def submit(self, kind, job_id, payload):
+        pass
+
+    def status(self, job_id):
+        return self.entries.pop(0) if len(self.entries) > 1 else self.entries[0]
+
+    def pending(self):
+        return None
+
+
+def test_finished_jobs_expire_after_ttl(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(jobs.time, 'monotonic', clock)
+    store = JobStore(ttl=60, stale_after=600)
+    store.set('done', {'status': 'completed', 'result': {}})
+    store.set('running', {'status': 'processing', 'result': None})
+
+    clock.now += 61
+    assert store.get('done') is None
+    assert store.get('running') is not None
+
+    clock.now += 600
+    assert store.get('running') is None
+    # The next write purges expired entries instead of only hiding them.
+    store.set('new', {'status': 'processing', 'result': None})
+    assert len(store) == 1
+
+
+def test_wait_for_change_wakes_on_update():
+    store = JobStore()
+    first = {'status': 'processing', 'result': None}
+    store.set('job', first)
+    threading.Timer(0.05, store.set, ('job', {'status': 'completed', 'result': {}})).start()
+    assert store.wait_for_change('job', first, timeout=5)['status'] == 'completed'
+
+
+def test_full_queue_is_rejected_and_discarded():
+    # No workers, so the single queue slot stays taken.
+    engine = JobEngine(InProcessBackend({'translate': lambda job_id: None}, workers=0, queue_size=1), JobStore())
+    engine.submit('translate', 'first')
+    with pytest.raises(JobQueueFull):
+        engine.submit('translate', 'second')
+    assert engine.status('first') is not None
+    assert engine.status('second') is None
+
+
+def test_translate_returns_429_when_queue_is_full(client, app_module, monkeypatch):
+    engine = JobEngine(InProcessBackend({'translate': lambda job_id, **payload: None}, workers=0, queue_size=1), JobStore())
+    monkeypatch.setattr(app_module, 'job_engine', engine)
+    body = {'text': 'The tenant shall pay the rent.', 'languages': ['hi']}
+
+    assert client.post('/api/translate', json=body).status_code == 202
+    response = client.post('/api/translate', json=body)
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '30'
+    assert len(engine.store) == 1
+
+
+@pytest.fixture
+def celery_engine(app_module, monkeypatch):
+    import tasks
+    use_in_memory_broker(tasks.celery)
+    engine = JobEngine(
+        CeleryBackend({'translate': (tasks.run_translation_task, app_module.celery_translation_kwargs)}),
+        JobStore(),
+        poll_interval=0.01
+    )
+    monkeypatch.setattr(app_module, 'job_engine', engine)
+    return engine
+
+
+def test_celery_memory_backend_runs_translation(client, celery_engine):
+    text = "The tenant shall pay the rent. The landlord shall repair the roof."
+    response = client.post('/api/translate', json={'text': text, 'languages': ['hi', 'fr']})
+    assert response.status_code == 202
+    task_id = response.get_json()['task_id']
+
+    status = client.get(f'/api/translation_status/{task_id}').get_json()
+    assert status['status'] == 'completed'
+    assert set(status['result']['translations']) == {'hi', 'fr'}
+
+    events = client.get(f'/api/translation_events/{task_id}').get_data(as_text=True)
+    assert 'event: completed' in events
+
+
+def test_celery_task_reports_in_process_progress_shape(client, celery_engine, monkeypatch):
+    import tasks
+    updates = []
+    monkeypatch.setattr(tasks.run_translation_task, 'update_state', lambda **kwargs: updates.append(kwargs['meta']))
+    client.post('/api/translate', json={'text': 'The rent is due monthly.', 'languages': ['hi', 'fr']})
+
+    progress = updates[-1]['progress']
+    assert progress['completed_chunks'] == progress['total_chunks'] == 2
+    assert progress['languages'] == {'hi': {'completed': 1, 'total': 1}, 'fr': {'completed': 1, 'total': 1}}
+    assert all(parts[0] for parts in updates[-1]['partial'].values())
+
+
+@pytest.mark.parametrize('info', [
+    {'progress': {'completed_chunks': 1, 'total_chunks': 2, 'languages': {'hi': {'completed': 1, 'total': 1}, 'fr': {'completed': 0, 'total': 1}}},
+     'partial': {'hi': ['namaste'], 'fr': [None]}},
+    # What older Celery workers report.
+    {'completed_chunks': 1, 'total_chunks': 2},
+])
+def test_event_stream_handles_celery_progress(client, app_module, monkeypatch, info):
+    running = {'status': 'processing', 'result': None}
+    if 'progress' in info:
+        running.update(progress=info['progress'], partial=info['partial'])
+    else:
+        running['progress'] = info
+    done = {'status': 'completed', 'result': {'translations': {'hi': {'translated': 'namaste'}}}}
+    engine = JobEngine(ScriptedBackend([running, running, done]), JobStore(), poll_interval=0.01)
+    monkeypatch.setattr(app_module, 'job_engine', engine)
+    engine.submit('translate', 'job')
+
+    events = client.get('/api/translation_events/job').get_data(as_text=True)
+    assert 'event: progress' in events
+    assert 'event: completed' in events
+    if 'partial' in info:
+        assert 'event: chunk' in events and 'event: language' in events
+
+
+def wait_for_result(client, task_id, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = client.get(f'/api/translation_status/{task_id}').get_json()
+        if status['status'] in ('completed', 'failed'):
+            return status
+        time.sleep(0.01)
+    raise AssertionError(f"Translation {task_id} did not finish")
+
+
+def test_celery_and_in_process_jobs_join_chunks_the_same_way(client, app_module, monkeypatch):
+    import tasks
+    monkeypatch.setattr(app_module, 'TRANSLATION_CHUNK_TOKENS', 10)
+    monkeypatch.setattr(tasks, 'TRANSLATION_CHUNK_TOKENS', 10)
+    body = {'text': "1. RENT: The rent is due monthly.\n\n2. DEPOSIT: The deposit is refundable.\n3. NOTICE: Two months.",
+            'languages': ['hi']}
+    in_process = wait_for_result(client, client.post('/api/translate', json=body).get_json()['task_id'])
+
+    use_in_memory_broker(tasks.celery)
+    engine = JobEngine(CeleryBackend({'translate': (tasks.run_translation_task, app_module.celery_translation_kwargs)}),
+                       JobStore(), poll_interval=0.01)
+    monkeypatch.setattr(app_module, 'job_engine', engine)
+    celery = wait_for_result(client, client.post('/api/translate', json=body).get_json()['task_id'])
+
+    translated = in_process['result']['translations']['hi']['translated']
+    assert '\n\n' in translated and translated.count('\n') == 3
+    assert celery['result']['translations']['hi']['translated'] == translated
@@ -0,0 +1,73 @@
+# tests/test_normalization.py
+import normalization
+from normalization import normalize_document, normalize_text
+
+
+def test_pasted_text_keeps_numbers_on_their_own_lines():
+    assert normalize_text("Total due:\n500")[0] == "Total due:\n500"
+    text = "1\nThe tenant pays rent.\n12"
+    assert normalize_text(text)[0] == text
+
+
+def test_page_numbers_are_stripped_only_when_they_follow_the_pages():
+    bodies = ["The rent is due monthly.", "The deposit is refundable.", "Either party may terminate.", "Disputes go to arbitration."]
+    pages = [f"{body}\n- {n} -" for n, body in enumerate(bodies, start=1)]
+    text, stats = normalize_document(pages, 'lease.pdf')
+    assert '- 1 -' not in text and '- 4 -' not in text
+    assert stats['edge_lines_removed'] == 4
+
+
+def test_page_numbers_with_an_unnumbered_cover_page():
+    pages = ["LEASE AGREEMENT"] + [f"Body of page {n}.\nPage {n} of 3" for n in range(1, 4)]
+    text, _ = normalize_document(pages, 'lease.pdf')
+    assert 'Page 2 of 3' not in text and 'LEASE AGREEMENT' in text
+
+
+def test_numbered_clause_under_a_header_is_kept():
+    pages = [
+        "RENTAL AGREEMENT\n(1) The term is eleven months.\nMore terms.\n1",
+        "RENTAL AGREEMENT\nThe deposit is refundable.\nMore terms.\n2",
+        "RENTAL AGREEMENT\nThe notice period is one month.\nMore terms.\n3",
+    ]
+    text, _ = normalize_document(pages, 'lease.pdf')
+    assert '(1) The term is eleven months.' in text
+    assert 'RENTAL AGREEMENT' not in text
+    assert not any(line.strip() in ('1', '2', '3') for line in text.split('\n'))
+
+
+def test_numbers_that_do_not_count_up_are_kept():
+    pages = ["Amount payable:\n500", "Late fee per day:\n50"]
+    text, _ = normalize_document(pages, 'fees.pdf')
+    assert '500' in text and '50' in text
+
+
+def test_list_items_are_not_joined_to_the_previous_line():
+    text = "The tenant shall\na) pay rent monthly\nb) keep the premises clean\n(iv) allow inspections"
+    assert normalize_text(text)[0] == text
+
+
+def test_broken_lines_are_still_joined():
+    assert normalize_text("The tenant shall pay\nthe rent on time.")[0] == "The tenant shall pay the rent on time."
+    assert normalization.clean_text("agree-\nment") == "agreement"
+
+
+def test_clause_text_repeated_at_the_same_place_on_every_page_is_kept():
+    from fixtures import agreement_text
+    pages = agreement_text(3).split('\f')
+    text, stats = normalize_document(pages, 'lease.txt')
+    assert stats['edge_lines_removed'] == 0
+    assert text.count('BETWEEN: Mr. Ravi Kumar') == 3
+    assert text.count('6. The landlord may increase the rent') == 3
+
+
+def test_short_running_headers_are_still_removed():
+    pages = [f"CONFIDENTIAL - DRAFT\nSection {n} body text that is real content.\nMore content on page {n}." for n in range(1, 4)]
+    text, stats = normalize_document(pages, 'lease.pdf')
+    assert 'CONFIDENTIAL' not in text and stats['edge_lines_removed'] == 3
+
+
+def test_fast_clause_review_of_pasted_pages_sees_every_clause(client):
+    from fixtures import agreement_text
+    result = client.post('/api/compare_clauses', json={'text': agreement_text(3), 'mode': 'fast'}).get_json()
+    assert result['risky_clauses']
+    assert result['missing_clauses'] == []
@@ -0,0 +1,21 @@
+# tests/test_speak.py
+import os
+
+import pytest
+
+import tts
+
+
+@pytest.mark.parametrize('lang', ['../../x', 'en/../../x', '', 7])
+def test_speak_rejects_invalid_language_codes(client, app_module, lang):
+    response = client.post('/api/speak', json={'text': 'Hello', 'lang': lang})
+    assert response.status_code == 400
+    assert not os.path.exists(os.path.join(app_module.tts_cache.cache_dir, '..', '..', 'x.mp3'))
+
+
+def test_cache_paths_stay_inside_the_cache_dir(tmp_path):
+    cache = tts.TTSCache(str(tmp_path))
+    _, path = cache.path_for('Hello', 'zh-CN')
+    assert os.path.dirname(path) == str(tmp_path)
+    with pytest.raises(ValueError):
+        cache.path_for('Hello', '../../x')
@@ -0,0 +1,158 @@
+# translation_memory.py
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import threading
+
+from clause_detector import SECTION_BREAK
+import metrics
+
+TM_SEGMENTS = metrics.counter('demystilex_translation_memory_segments_total',
+                              'Translatable segments looked up in the translation memory.', ('result',))
+
+_LETTER = re.compile(r'[^\W\d_]')
+# Clause boundaries, plus no break after an initial ("R. Gupta"), so names stay in one segment.
+_SEGMENT_BREAK = re.compile(r'(?<!\b[A-Z]\.)' + SECTION_BREAK.pattern)
+# SQLite's default limit on bound parameters is 999.
+_LOOKUP_BATCH = 500
+
+
+def normalize_segment(text):
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def split_segments(text):
+    """[(segment, separator)] at sentence and line breaks; joining every segment + separator gives back `text`."""
+    parts, start = [], 0
+    for match in _SEGMENT_BREAK.finditer(text):
+        parts.append((text[start:match.start()], match.group(0)))
+        start = match.end()
+    parts.append((text[start:], ''))
+    return parts
+
+
+def is_translatable(segment):
+    # Clause numbers, amounts and blank lines are kept as they are.
+    return bool(_LETTER.search(segment))
+
+
+def _key(normalized):
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+class TranslationMemory:
+    """Translated segments keyed by (normalized source segment, target language), persisted to SQLite."""
+
+    def __init__(self, path, max_entries=200000):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._stores = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS translation_memory (
+                    lang TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    source TEXT NOT NULL,
+                    translation TEXT NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0,
+                    used_at REAL NOT NULL,
+                    PRIMARY KEY (lang, key)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS translation_memory_used_at ON translation_memory (used_at)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10)
+
+    def lookup(self, lang, segments):
+        """{normalized segment: translation} for the segments already in the memory."""
+        keys = {_key(segment): segment for segment in dict.fromkeys(segments)}
+        found = {}
+        with self._connect() as conn:
+            key_list = list(keys)
+            for start in range(0, len(key_list), _LOOKUP_BATCH):
+                batch = key_list[start:start + _LOOKUP_BATCH]
+                rows = conn.execute(
+                    f"SELECT key, translation FROM translation_memory WHERE lang = ? AND key IN ({','.join('?' * len(batch))})",
+                    [lang] + batch
+                ).fetchall()
+                found.update(rows)
+            if found:
+                with self._lock:
+                    conn.executemany(
+                        "UPDATE translation_memory SET hits = hits + 1, used_at = ? WHERE lang = ? AND key = ?",
+                        [(time.time(), lang, key) for key in found]
+                    )
+        return {keys[key]: translation for key, translation in found.items()}
+
+    def store(self, lang, pairs):
+        """Remember (normalized segment, translation) pairs; the least recently used entries are dropped past max_entries."""
+        now = time.time()
+        rows = [(lang, _key(segment), segment, translation, now) for segment, translation in pairs]
+        if not rows:
+            return
+        with self._lock, self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO translation_memory (lang, key, source, translation, used_at) VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            self._stores += 1
+            # Counting on every write would be wasted work; trimming every 100 stores is close enough.
+            if self.max_entries and self._stores % 100 == 0:
+                conn.execute(
+                    "DELETE FROM translation_memory WHERE rowid IN (SELECT rowid FROM translation_memory "
+                    "ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                )
+
+    def __len__(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM translation_memory").fetchone()[0]
+
+
+def translate(memory, text, lang, translate_segments):
+    """Translate `text` segment by segment, reusing remembered segments.
+
+    Only the misses are passed, once each, to translate_segments(list) -> list of translations.
+    Returns (translated text, {'segments': n, 'hits': n, 'model_calls': n}).
+    Raises ValueError unless translate_segments returns one string per segment.
+    """
+    parts = split_segments(text)
+    wanted = [normalize_segment(segment) for segment, _ in parts if is_translatable(segment)]
+    known = memory.lookup(lang, wanted)
+    hits = sum(1 for segment in wanted if segment in known)
+    misses = [segment for segment in dict.fromkeys(wanted) if segment not in known]
+    TM_SEGMENTS.inc(hits, result='hit')
+    TM_SEGMENTS.inc(len(wanted) - hits, result='miss')
+    if misses:
+        translated = translate_segments(misses)
+        if not isinstance(translated, list) or len(translated) != len(misses) or not all(isinstance(t, str) for t in translated):
+            raise ValueError(f"Expected {len(misses)} segment translations as strings, got {str(translated)[:100]}")
+        new = {segment: translation.strip() for segment, translation in zip(misses, translated)}
+        memory.store(lang, new.items())
+        known.update(new)
+
+    output = []
+    for segment, separator in parts:
+        if is_translatable(segment):
+            stripped = segment.strip()
+            start = segment.index(stripped)
+            output.append(segment[:start] + known[normalize_segment(segment)] + segment[start + len(stripped):])
+        else:
+            output.append(segment)
+        output.append(separator)
+    return ''.join(output), {'segments': len(wanted), 'hits': hits, 'model_calls': 1 if misses else 0}
+
+
+def job_report(stats_by_lang):
+    """Overall and per-language segment hit rates for one translation job."""
+    def with_rate(stats):
+        return dict(stats, hit_rate=round(stats['hits'] / stats['segments'], 4) if stats['segments'] else 0.0)
+    total = {name: sum(stats.get(name, 0) for stats in stats_by_lang.values()) for name in ('segments', 'hits', 'model_calls')}
+    return dict(with_rate(total), languages={lang: with_rate(stats) for lang, stats in stats_by_lang.items()})
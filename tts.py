@@ -0,0 +1,173 @@
+# tts.py
+import os
+import io
+import re
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from chunking import split_into_chunks, CHARS_PER_TOKEN
+import metrics
+import startup
+
+# Language codes become part of cache keys and file names, so nothing else gets through.
+LANG_CODE = re.compile(r'[A-Za-z-]+')
+
+
+@metrics.timed('tts_chunk')
+def synthesize_chunk(text, lang):
+    buffer = io.BytesIO()
+    startup.load('gtts').gTTS(text=text, lang=lang, slow=False).write_to_fp(buffer)
+    return buffer.getvalue()
+
+
+class Synthesis:
+    """One in-flight synthesis; every request for the same text shares it."""
+
+    def __init__(self, cache, key, path, chunks, lang):
+        self.cache = cache
+        self.key = key
+        self.path = path
+        self.chunks = chunks
+        self.lang = lang
+        self.futures = []
+        self.error = None
+        self.done = threading.Event()
+        self._remaining = len(chunks)
+        self._lock = threading.Lock()
+
+    def begin(self, executor):
+        self.futures = [executor.submit(synthesize_chunk, chunk, self.lang) for chunk in self.chunks]
+        for future in self.futures:
+            future.add_done_callback(self._chunk_done)
+
+    def _chunk_done(self, _):
+        with self._lock:
+            self._remaining -= 1
+            if self._remaining:
+                return
+        # MP3 frames can be concatenated as-is; gTTS does the same for its own segments.
+        try:
+            self.cache._store(self.path, b''.join(future.result() for future in self.futures))
+        except Exception as e:
+            logging.error(f"Text-to-speech synthesis failed: {str(e)}")
+            self.error = e
+        finally:
+            self.cache._finish(self.key)
+            self.done.set()
+
+    def iter_audio(self):
+        # Chunks are yielded in order, each as soon as it is ready.
+        for future in self.futures:
+            yield future.result()
+
+    def wait(self, timeout=None):
+        if not self.done.wait(timeout):
+            raise TimeoutError("Text-to-speech synthesis timed out.")
+        if self.error is not None:
+            raise self.error
+        return self.path
+
+
+class TTSCache:
+    """Size-bounded LRU cache of synthesized MP3 files with single-flight synthesis."""
+
+    def __init__(self, cache_dir, max_bytes=512 * 1024 * 1024, chunk_chars=400, workers=4):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.chunk_chars = chunk_chars
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='tts')
+        self._inflight = {}
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self._bytes = sum(size for _, size, _ in self._entries())
+
+    def path_for(self, text, lang='en'):
+        if not LANG_CODE.fullmatch(lang or ''):
+            raise ValueError(f"Invalid language code: {lang!r}")
+        text_hash = hashlib.md5(text.encode('utf-8')).hexdigest()
+        key = text_hash if lang == 'en' else f"{text_hash}-{lang}"
+        return key, self.path_for_key(key)
+
+    def path_for_key(self, key):
+        return os.path.join(self.cache_dir, f"{key}.mp3")
+
+    def lookup_key(self, key):
+        path = self.path_for_key(key)
+        try:
+            os.utime(path)
+            return path
+        except FileNotFoundError:
+            return None
+
+    def inflight(self, key):
+        with self._lock:
+            return self._inflight.get(key)
+
+    def lookup(self, text, lang='en'):
+        # Bumps the mtime so eviction sees the file as recently used.
+        key, _ = self.path_for(text, lang)
+        return self.lookup_key(key)
+
+    def start(self, text, lang='en'):
+        """Return the shared Synthesis for this text, or None if it is already cached."""
+        key, path = self.path_for(text, lang)
+        with self._lock:
+            if os.path.exists(path):
+                return None
+            synthesis = self._inflight.get(key)
+            if synthesis is not None:
+                return synthesis
+            chunks = [chunk for chunk in split_into_chunks(text, max(1, self.chunk_chars // CHARS_PER_TOKEN)) if chunk.strip()]
+            synthesis = Synthesis(self, key, path, chunks or [text], lang)
+            self._inflight[key] = synthesis
+        synthesis.begin(self._executor)
+        return synthesis
+
+    def synthesize(self, text, lang='en', timeout=120):
+        synthesis = self.start(text, lang)
+        if synthesis is None:
+            return self.lookup(text, lang)
+        return synthesis.wait(timeout)
+
+    def stats(self):
+        with self._lock:
+            return {'bytes': self._bytes, 'in_flight': len(self._inflight)}
+
+    def _finish(self, key):
+        with self._lock:
+            self._inflight.pop(key, None)
+
+    def _store(self, path, data):
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._bytes += len(data)
+            if self._bytes > self.max_bytes:
+                self._evict()
+
+    def _entries(self):
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.mp3'):
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                yield path, stat.st_size, stat.st_mtime
+
+    def _evict(self):
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= self.max_bytes * 0.9:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        self._bytes = total